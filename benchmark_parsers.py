@@ -0,0 +1,131 @@
+"""
+Compare the HTML parser backends on saved copies of the jwst pages
+
+Every backend must give exactly the same rows as html.parser, the script stops otherwise.
+--scale times the extractors on synthetic pages of growing size instead (see synthetic_pages),
+a time per row that grows with the size points at super-linear behaviour.
+
+e.g. python benchmark_parsers.py --go cycle-1-go.html --gto gto.html --ddt ddt.html --status 1433.html
+     python benchmark_parsers.py --scale 1000 10000 100000 --parser selectolax
+"""
+import argparse
+import time
+import tracemalloc
+
+from get_nirspec_mos_info import parse_basic_info_GO, parse_basic_info_GTO, parse_basic_info_DDT, \
+    parse_observation_status
+from html_backends import available_backends
+from synthetic_pages import go_page, gto_page, ddt_page, status_page
+
+
+PARSE_FUNCTIONS = {
+    "go": lambda content, parser, keep_all=False: parse_basic_info_GO(content, "Cycle", parser, keep_all),
+    "gto": parse_basic_info_GTO,
+    "ddt": parse_basic_info_DDT,
+    "status": parse_observation_status,
+}
+
+
+def benchmark_page(kind, path, repeat=5):
+    """
+    Time every available backend on one saved page
+
+    Args:
+        kind (str): Page type, one of "go", "gto", "ddt" or "status"
+        path (str): Saved HTML file
+        repeat (int): Number of parses per backend, the best time is kept
+    Returns:
+        timings (dict): {backend name: best parse time in seconds}
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    parse = PARSE_FUNCTIONS[kind]
+
+    return _time_backends(parse, content, path, repeat)
+
+
+def _time_backends(parse, content, path, repeat):
+    reference = parse(content, "html.parser")
+    timings = {}
+    for backend in available_backends():
+        if parse(content, backend) != reference:
+            raise AssertionError(f"{backend} rows differ from html.parser on {path}")
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(content, backend)
+            best = min(best, time.perf_counter() - start)
+        timings[backend] = best
+    return timings
+
+
+# Synthetic page of n rows for each page type
+SYNTHETIC_PAGES = {
+    "go": lambda n: go_page(n, n_topics=20)[0],
+    "gto": lambda n: gto_page(n)[0],
+    "ddt": lambda n: ddt_page(n)[0],
+    "status": lambda n: status_page(1000, n),
+}
+
+
+def scale_curve(kind, sizes, parser="auto", repeat=3):
+    """
+    Parse time and memory of one extractor on synthetic pages of growing size
+    ** Every row of the page is kept (keep_all), so the cost is not hidden by the filter **
+
+    Memory is the tracemalloc peak of one parse, i.e. what is allocated through Python
+    (the lexbor tree of selectolax included, the libxml2 buffers of lxml not).
+
+    Args:
+        kind (str): Page type, one of "go", "gto", "ddt" or "status"
+        sizes (list): Numbers of rows (visits for "status") to try
+        parser (str): HTML parser backend
+        repeat (int): Number of parses per size, the best time is kept
+    Returns:
+        points (list): (rows, page bytes, best seconds, peak bytes) per size
+    """
+    parse = PARSE_FUNCTIONS[kind]
+    points = []
+    for size in sizes:
+        content = SYNTHETIC_PAGES[kind](size)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(content, parser, True)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        parse(content, parser, True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        points.append((size, len(content), best, peak))
+    return points
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for kind in PARSE_FUNCTIONS:
+        arg_parser.add_argument(f"--{kind}", nargs="*", default=[], help=f"saved {kind} page(s)")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=5, help="parses per backend (best is kept)")
+    arg_parser.add_argument("--scale", type=int, nargs="*", default=[], help="synthetic page sizes (rows) to time")
+    arg_parser.add_argument("--parser", default="auto", help="backend used by --scale")
+    args = arg_parser.parse_args()
+
+    if args.scale:
+        for kind in PARSE_FUNCTIONS:
+            print(f"{kind} ({args.parser})")
+            for rows, n_bytes, seconds, peak in scale_curve(kind, args.scale, args.parser, args.repeat):
+                print(f"    {rows:>8} rows {n_bytes / 1e6:8.1f} MB {seconds * 1000:10.1f} ms "
+                      f"{seconds * 1e6 / rows:7.2f} us/row   peak {peak / 1e6:8.1f} MB")
+        return
+
+    for kind in PARSE_FUNCTIONS:
+        for path in getattr(args, kind):
+            timings = benchmark_page(kind, path, args.repeat)
+            baseline = timings["html.parser"]
+            print(f"{kind} {path}")
+            for backend, seconds in timings.items():
+                print(f"    {backend:<12} {seconds * 1000:9.2f} ms   x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
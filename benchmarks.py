@@ -0,0 +1,250 @@
+"""
+Benchmark suite of the scraper, with a machine-readable history and a regression check
+
+Every run times the parse of each listing page type, the parse of one visit status page
+(averaged over the recorded fixtures), the merge-and-write stage and a whole harvest
+against the local stand-in server, then appends the timings to a JSONL history file.
+`check` compares the last run with the median of the previous runs on the same machine
+and exits with status 1 if a metric got slower by more than the threshold.
+
+e.g. python benchmarks.py run                    # append a run to .benchmarks/history.jsonl
+     python benchmarks.py check --threshold 15   # fail if the last run regressed by more than 15%
+     python benchmarks.py run --check            # both, e.g. before and after a change
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmark_parsers import PARSE_FUNCTIONS, SYNTHETIC_PAGES
+from get_nirspec_mos_info import build_status_table, harvest
+from html_backends import get_backend
+from stsci_client import StsciClient, AdaptiveRateLimiter
+from stsci_stub_server import StubStsci
+from synthetic_pages import STATUS_HEADERS
+
+
+# Machine-specific timings, kept out of the repository (see .gitignore)
+DEFAULT_HISTORY = os.path.join(".benchmarks", "history.jsonl")
+
+# Listing page sizes (rows) of the parse benchmarks, about the size of the real pages
+PAGE_ROWS = {"go": 500, "gto": 250, "ddt": 150}
+
+
+def _best_time(func, repeat, min_sample=0.05):
+    # Best of `repeat` samples, short functions are looped so that a sample lasts at least min_sample seconds
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample:
+            break
+        loops = max(loops * 2, int(loops * min_sample / max(elapsed, 1e-9)) + 1)
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def bench_parse(kind):
+    """Parse time of a synthetic listing page of PAGE_ROWS[kind] rows"""
+    def bench(fixtures, repeat, parser):
+        content = SYNTHETIC_PAGES[kind](PAGE_ROWS[kind])
+        return _best_time(lambda: PARSE_FUNCTIONS[kind](content, parser), repeat)
+    return bench
+
+
+def bench_parse_status(fixtures, repeat, parser):
+    """Mean parse time of one get-visit-status page, over every recorded status page"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures, "status", "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    if not pages:
+        raise FileNotFoundError(f"No status pages in {fixtures}/status")
+    parse = PARSE_FUNCTIONS["status"]
+    return _best_time(lambda: [parse(content, parser) for content in pages], repeat) / len(pages)
+
+
+def bench_merge_write(fixtures, repeat, parser, n_programs=2000, visits=20):
+    """build_status_table and to_csv of n_programs listings with `visits` visits each"""
+    basic_df = pd.DataFrame({"ID": [str(1000 + i) for i in range(n_programs)],
+                             "Program Title": [f"Program {i}" for i in range(n_programs)],
+                             "Instrument/ Mode": "NIRSpec/MOS"})
+    statuses = {}
+    for i in range(n_programs):
+        status_data = [dict(zip(STATUS_HEADERS, [str(visit // 4 + 1), str(visit % 4 + 1), "Archived", f"T-{i}",
+                                                 "NIRSpec MultiObject Spectroscopy", "2.50"]))
+                       for visit in range(visits)]
+        statuses[str(1000 + i)] = (status_data, STATUS_HEADERS)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "status.csv")
+        return _best_time(lambda: build_status_table(basic_df, statuses).to_csv(path, index=False), repeat)
+
+
+def bench_harvest(fixtures, repeat, parser, concurrency=16):
+    """Whole harvest (every listing page, every status page, merge) against StubStsci serving `fixtures`"""
+    with StubStsci(fixtures) as stub:
+        def run():
+            # A fresh client every time, so nothing comes from a cache, and no rate limit to speak of
+            limiter = AdaptiveRateLimiter(initial_rate=10000, max_rate=10000, burst=1000)
+            with StsciClient(pool_size=concurrency, rate_limiter=limiter, base_url=stub.base_url) as client:
+                asyncio.run(harvest(concurrency=concurrency, client=client))
+        return _best_time(run, min(repeat, 3))
+
+
+# Metric name -> benchmark(fixtures, repeat, parser) returning seconds
+BENCHMARKS = {
+    "parse.go": bench_parse("go"),
+    "parse.gto": bench_parse("gto"),
+    "parse.ddt": bench_parse("ddt"),
+    "parse.status_per_proposal": bench_parse_status,
+    "merge_write": bench_merge_write,
+    "harvest.fixtures": bench_harvest,
+}
+
+
+def run_suite(fixtures="fixtures", repeat=5, parser="auto", only=None):
+    """
+    Run the benchmarks, best of `repeat` runs each
+    ** The scraper logs nothing unless configure_logging was called, so console I/O is not timed **
+
+    Args:
+        fixtures (str): Fixtures directory served to the harvest benchmark (see stsci_stub_server)
+        repeat (int): Runs per benchmark, the best time is kept (at most 3 for the harvest)
+        parser (str): HTML parser backend
+        only (list): Metric name prefixes to run, e.g. ["parse."], all by default
+    Returns:
+        metrics (dict): {metric name: seconds}
+    """
+    metrics = {}
+    for name, benchmark in BENCHMARKS.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        metrics[name] = benchmark(fixtures, repeat, parser)
+        print(f"    {name:<28} {metrics[name] * 1000:10.2f} ms")
+    return metrics
+
+
+def append_history(path, metrics, parser="auto", repeat=5, label=None):
+    """
+    Append one run to the JSONL history, with what is needed to compare runs fairly
+    """
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "label": label,
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "parser": get_backend(parser).name,
+        "repeat": repeat,
+        "metrics": metrics,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_regressions(history, threshold=20.0, window=5, min_delta=0.0005):
+    """
+    Compare the last run of a history with the median of the previous ones
+    ** Only runs from the same host with the same parser backend are compared **
+
+    Args:
+        history (list): Records as written by append_history, oldest first
+        threshold (float): Allowed slowdown, in percent
+        window (int): Number of previous runs the baseline is the median of
+        min_delta (float): Slowdowns smaller than this many seconds are ignored, whatever the percentage
+    Returns:
+        regressions (list): (metric, baseline seconds, last seconds, change in percent) of every regressed metric
+    """
+    if not history:
+        print("No benchmark history yet")
+        return []
+    last = history[-1]
+    previous = [record for record in history[:-1]
+                if record["host"] == last["host"] and record["parser"] == last["parser"]][-window:]
+    if not previous:
+        print("No earlier run on this machine to compare with")
+        return []
+
+    regressions = []
+    for name, seconds in last["metrics"].items():
+        values = [record["metrics"][name] for record in previous if name in record["metrics"]]
+        if not values:
+            continue
+        baseline = statistics.median(values)
+        change = (seconds - baseline) / baseline * 100
+        regressed = change > threshold and seconds - baseline > min_delta
+        print(f"    {name:<28} {baseline * 1000:10.2f} ms -> {seconds * 1000:10.2f} ms  {change:+7.1f}%"
+              + ("  REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append((name, baseline, seconds, change))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("command", choices=["run", "check"])
+    arg_parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSONL history file")
+    arg_parser.add_argument("--fixtures", default="fixtures", help="fixtures served to the harvest benchmark")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=5, help="runs per benchmark (best is kept)")
+    arg_parser.add_argument("--parser", default="auto", help="HTML parser backend")
+    arg_parser.add_argument("--only", nargs="*", help="metric name prefixes to run, e.g. parse.")
+    arg_parser.add_argument("--label", help="free text stored with the run, e.g. a branch name")
+    arg_parser.add_argument("--check", action="store_true", help="check for regressions after the run")
+    arg_parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown in percent")
+    arg_parser.add_argument("--window", type=int, default=5, help="previous runs the baseline is the median of")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "run":
+        print(f"Running benchmarks ({get_backend(args.parser).name}, best of {args.repeat})")
+        metrics = run_suite(args.fixtures, args.repeat, args.parser, args.only)
+        append_history(args.history, metrics, args.parser, args.repeat, args.label)
+        print(f"Appended to {args.history}")
+        if not args.check:
+            return
+
+    print(f"Comparing the last run with the median of up to {args.window} earlier ones")
+    regressions = check_regressions(load_history(args.history), args.threshold, args.window)
+    if regressions:
+        print(f"{len(regressions)} metric(s) slower by more than {args.threshold}%")
+        sys.exit(1)
+    print("No regression")
+
+
+if __name__ == "__main__":
+    main()
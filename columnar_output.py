@@ -0,0 +1,197 @@
+"""
+Typed Parquet and Arrow output of the visit status tables, instead of re-parsing CSV text on every read
+
+The Parquet dataset is partitioned by source kind (GO, GTO, DDT) and cycle, e.g.
+NIRSpec_MOS_status/source_kind=GO/cycle=2/part-0.parquet, and every file is sorted by Status,
+so a reader asking for one cycle or one status only opens (and decodes) the files and row groups
+that hold it. The Arrow IPC file is uncompressed, so it can be memory-mapped back at no cost.
+
+e.g. df = await harvest()
+     write_parquet(df, 'NIRSpec_MOS_status')
+     scheduled = read_parquet('NIRSpec_MOS_status', source_kind="GO", cycle=3, status="Scheduled")
+     write_arrow(df, 'NIRSpec_MOS_status.arrow')
+     df = read_arrow('NIRSpec_MOS_status.arrow')
+
+Needs pyarrow (pip install pyarrow), the rest of the scraper does not.
+"""
+import re
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional
+    pa = None
+
+
+PARTITION_COLUMNS = ["source_kind", "cycle"]
+
+# Columns stored as numbers and as timestamps, when every non-empty value of the table converts
+NUMERIC_COLUMNS = ["Observation", "Visit", "Hours", "Allocated Hours", "Exclusive Access Period (months)"]
+DATETIME_COLUMNS = ["Start UT", "End UT"]
+DATETIME_FORMAT = "%b %d, %Y %H:%M:%S"  # e.g. Sep 23, 2022 11:42:17
+
+# Columns with few distinct values, stored dictionary-encoded
+CATEGORY_COLUMNS = ["source", "Status", "Template"]
+
+# Partition value of the pages that span several cycles (GTO)
+NO_CYCLE = "all"
+
+_CYCLE_NUMBER = re.compile(r"\d+")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet and Arrow output need pyarrow: pip install pyarrow")
+
+
+def _partition_cycle(source, cycle):
+    # Cycle number from the page name (GO Cycle 2) or from the page's Cycle column (DDT)
+    match = _CYCLE_NUMBER.search(source[3:] if source.startswith("GO ") else cycle or "")
+    return str(int(match.group())) if match else NO_CYCLE
+
+
+def typed_status_frame(df_status):
+    """
+    Copy of a status table with real dtypes and the partition columns added
+    ** Blank cells become nulls in the numeric and timestamp columns, text stays text **
+
+    Args:
+        df_status (pd.DataFrame): Table as returned by harvest or build_status_table (or read from its CSV)
+    Returns:
+        df (pd.DataFrame): Same rows, with source_kind ("GO", "GTO" or "DDT") and cycle ("1", "2"... or "all")
+    """
+    df = df_status.copy()
+    for column in df.columns:
+        if column in NUMERIC_COLUMNS:
+            df[column] = _convert(df[column], lambda values: pd.to_numeric(values))
+            if column in ("Observation", "Visit") and pd.api.types.is_float_dtype(df[column]):
+                df[column] = df[column].astype("Int64")
+        elif column in DATETIME_COLUMNS:
+            df[column] = _convert(df[column], lambda values: pd.to_datetime(values, format=DATETIME_FORMAT))
+        elif column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype("string").astype("category")
+        else:
+            df[column] = df[column].astype("string")
+
+    source = df["source"].astype("string").fillna("") if "source" in df.columns else pd.Series("", index=df.index)
+    cycle = df["Cycle"].fillna("") if "Cycle" in df.columns else pd.Series("", index=df.index)
+    df["source_kind"] = source.str.split(" ").str[0].replace("", "unknown").astype("string")
+    df["cycle"] = pd.Series([_partition_cycle(name, value) for name, value in zip(source, cycle)],
+                            index=df.index, dtype="string")
+    return df
+
+
+def _convert(series, convert):
+    # Convert the non-blank values, keep the column as text if any of them does not convert
+    text = series.astype("string").str.strip()
+    blank = text.isna() | (text == "")
+    try:
+        converted = convert(text.mask(blank))
+    except (ValueError, TypeError):
+        return series.astype("string")
+    return converted
+
+
+def _to_table(df_status):
+    df = typed_status_frame(df_status)
+    if "Status" in df.columns:
+        df = df.sort_values("Status", kind="stable")  # Row group statistics then skip the other statuses
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_parquet(df_status, directory, compression="zstd", row_group_size=64 * 1024):
+    """
+    Write a status table as a Parquet dataset partitioned by source kind and cycle
+    ** Only the partitions present in df_status are replaced, the others are kept **
+
+    e.g. write_parquet(df_go3, 'NIRSpec_MOS_status')   # refreshes GO cycle 3, leaves GTO and DDT alone
+
+    Args:
+        df_status (pd.DataFrame): Table as returned by harvest or build_status_table
+        directory (str): Root directory of the dataset
+        compression (str): Parquet compression codec
+        row_group_size (int): Maximum rows per row group
+    """
+    _require_pyarrow()
+    pq.write_to_dataset(_to_table(df_status), directory, partition_cols=PARTITION_COLUMNS,
+                        compression=compression, row_group_size=row_group_size,
+                        existing_data_behavior="delete_matching", basename_template="part-{i}.parquet")
+
+
+def read_parquet(directory, source_kind=None, cycle=None, status=None, columns=None):
+    """
+    Read a Parquet dataset written by write_parquet, loading only what matches
+    ** Partitions of other sources or cycles are not opened, row groups of other statuses are skipped **
+
+    Args:
+        directory (str): Root directory of the dataset
+        source_kind (str): "GO", "GTO" or "DDT", None for all
+        cycle (int or str): Cycle number, e.g. 2, None for all
+        status (str): Keep visits with this Status, None keeps all
+        columns (list): Columns to load, None for all
+    Returns:
+        df (pd.DataFrame): Matching rows, grouped by partition and sorted by Status within each
+    """
+    _require_pyarrow()
+    partitioning = ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]), flavor="hive")
+    dataset = ds.dataset(directory, format="parquet", partitioning=partitioning)
+    table = dataset.to_table(columns=columns, filter=_filter(source_kind, cycle, status))
+    return table.to_pandas()
+
+
+def write_arrow(df_status, path):
+    """
+    Write a status table as one uncompressed Arrow IPC file, for memory-mapped reloads with read_arrow
+    """
+    _require_pyarrow()
+    table = _to_table(df_status)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_arrow(path, source_kind=None, cycle=None, status=None, columns=None, memory_map=True):
+    """
+    Read an Arrow IPC file written by write_arrow
+    ** Memory-mapped: nothing is read up front, only the rows and columns asked for are copied out **
+
+    Args:
+        path (str): Arrow IPC file
+        source_kind (str): "GO", "GTO" or "DDT", None for all
+        cycle (int or str): Cycle number, e.g. 2, None for all
+        status (str): Keep visits with this Status, None keeps all
+        columns (list): Columns to load, None for all
+        memory_map (bool): Map the file instead of reading it
+    Returns:
+        df (pd.DataFrame): Matching rows
+    """
+    _require_pyarrow()
+    source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+    with source:
+        table = pa.ipc.open_file(source).read_all()
+        expression = _filter(source_kind, cycle, status)
+        if expression is not None:
+            table = ds.dataset(table).to_table(filter=expression)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+
+def _filter(source_kind, cycle, status):
+    # pyarrow expression of the wanted rows, None for all rows
+    conditions = []
+    if source_kind is not None:
+        conditions.append(pc.field("source_kind") == source_kind)
+    if cycle is not None:
+        conditions.append(pc.field("cycle") == _partition_cycle("", str(cycle)))
+    if status is not None:
+        conditions.append(pc.field("Status") == status)
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
@@ -2,13 +2,139 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import pandas as pd
 import requests
-import time
+import argparse
+import asyncio
+import csv
+import json
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from stsci_client import StsciClient, get_default_client
+from status_store import StatusCache, StatusJournal, StatusRegistry, normalize_proposal_id
+from table_extraction import TableSpec, extract_tables, iter_table_rows
+from run_metrics import get_metrics
+from sqlite_store import SqliteObservationStore
+from columnar_output import write_arrow, write_parquet
+from status_history import StatusHistory
+from run_logging import ProgressLogger, configure_logging, get_logger, get_rows_logger
+
+# Silent unless configure_logging is called, parsed rows only go to capture_debug_rows
+logger = get_logger(__name__)
+rows_logger = get_rows_logger()
+
+
+# What each page type keeps, see TableSpec
+GO_TABLES = TableSpec(
+    ("Instrument/ Mode", "Instrument/Mode"),
+    lambda mode: "NIRSpec/MOS" in mode.replace('\n', '').replace('\r', '').replace(' ', ''),
+    topic_class='accordion__title-text',  # Titles (topics) corresponding to tables
+    name="GO",
+)
+GTO_TABLES = TableSpec(
+    ("Instrument/Mode", "Instrument/ Mode"),
+    lambda mode: "NIRSpec/MOS" in mode,
+    # Programs with "AR" icon have components that have no exclusive access period
+    # and can be used as a basis for GO Archival  Research (AR) Proposals.
+    image_flags={"AR?": "AR"},
+    name="GTO",
+)
+DDT_TABLES = TableSpec(("Instruments",), lambda instruments: "NIRSpec" in instruments, name="DDT")
+STATUS_TABLES = TableSpec(
+    ("Template",),
+    lambda template: "NIRSpec MultiObject Spectroscopy" in template,
+    header_tag='td',  # get-visit-status tables have no <th>
+    shared_headers=False,
+    name="status",
+)
+
+# Same pages without the row filter, used when every row goes into an ObservationStore
+GO_ALL_TABLES = GO_TABLES.keep_all()
+GTO_ALL_TABLES = GTO_TABLES.keep_all()
+DDT_ALL_TABLES = DDT_TABLES.keep_all()
+STATUS_ALL_TABLES = STATUS_TABLES.keep_all()
+
+# Columns the GO extractor appends to every row
+GO_EXTRA_HEADERS = ["Topic", "GO Cycle"]
+
+# Page-specific names of the columns harvest merges, mapped to the one name they get in its table
+COLUMN_SYNONYMS = {
+    "PID": "ID",
+    "Program Title": "Title",
+    "PI & Co-PIs": "PI",
+    "Principal Investigator": "PI",
+    "Instrument/ Mode": "Instruments",
+    "Instrument/Mode": "Instruments",
+}
+
+
+class Source(namedtuple("Source", ["kind", "url", "cycle"], defaults=[None])):
+    """
+    One listing page to extract basic info from
+
+    e.g. Source("GO", "https://www.stsci.edu/.../cycle-1-go", "Cycle 1")
+         Source("GTO", "https://www.stsci.edu/.../guaranteed-time-observations")
+
+    Attributes:
+        kind (str): "GO", "GTO" or "DDT"
+        url (str): URL of the page
+        cycle (str): Cycle number of a GO page, e.g. "Cycle 1"
+    """
+
+    @property
+    def name(self):
+        """Name the rows of the page are stored under, e.g. GO Cycle 1 or GTO"""
+        return f"{self.kind} {self.cycle}" if self.cycle else self.kind
+
+
+# Every listing page the notebook reads
+DEFAULT_SOURCES = [
+    Source("GO", "https://www.stsci.edu/jwst/science-execution/approved-programs/general-observers/cycle-1-go", "Cycle 1"),
+    Source("GO", "https://www.stsci.edu/jwst/science-execution/approved-programs/general-observers/cycle-2-go", "Cycle 2"),
+    Source("GO", "https://www.stsci.edu/jwst/science-execution/approved-programs/general-observers/cycle-3-go", "Cycle 3"),
+    Source("GTO", "https://www.stsci.edu/jwst/science-execution/approved-programs/guaranteed-time-observations"),
+    Source("DDT", "https://www.stsci.edu/jwst/science-execution/approved-programs/directors-discretionary-time"),
+]
+
+# Visit status page of one proposal, see get_observation_status
+STATUS_URL = "https://www.stsci.edu/cgi-bin/get-visit-status?id={proposal_id}&markupFormat=html&observatory=JWST&pi=1"
+
+# Rows yielded by iter_basic_info and iter_observation_status, `fields` maps header -> value
+ProgramRow = namedtuple("ProgramRow", ["source", "proposal_id", "fields"])
+VisitRow = namedtuple("VisitRow", ["proposal_id", "fields"])
+
+
+def _fetch_and_parse(url, client, parse_key, parse, spec, store, source, extra_headers=()):
+    """
+    Fetch a listing page and parse it, reusing the stored parse result if the page is unchanged (304)
+
+    With a store, every row is parsed and stored under `source`, and the rows matching
+    `spec` are picked out afterwards. Without one, only the matching rows are read.
+    `extra_headers` name the values `parse` appends to every row, they are stored with the page headers.
+    `parse` is called as parse(content, keep_all, metrics), with the metrics of the client.
+    """
+    client = client or get_default_client()
+    response = client.fetch(url)  # Retries, then raises an exception for HTTP errors
+
+    if store is not None:
+        parse_key += ":all"
+    cached = client.load_parsed(response, parse_key)
+    if cached is not None:
+        data, headers = cached
+    else:
+        data, headers = parse(response.content, store is not None, client.metrics)
+        client.store_parsed(response, parse_key, [data, headers])
+
+    if store is not None:
+        store.put_programs(source, data, (headers or []) + list(extra_headers))
+        store.save()
+        data = [row for row in data if spec.accepts(headers, row)]
+    return data, headers
 
 
-def extract_basic_info_from_GO(url, cycle_number):
+def extract_basic_info_from_GO(url, cycle_number, client=None, parser="auto", store=None):
     """
     Extract data from a SINGLE jwst GO cycle page.
     ** Specifically, this function extracts NIRSpec/MOS information from the tables on the page **
@@ -18,234 +144,614 @@ def extract_basic_info_from_GO(url, cycle_number):
     Args:
         url (str): URL of the page to extract data from
         cycle_number (str): Cycle number of the proposals
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        store (ObservationStore): If given, every row of the page is kept in it under "GO <cycle_number>"
     Returns:
         data (list): List of lists containing the extracted data
         headers (list): List of headers
     """
-    print(f"Extracting info for {cycle_number}...")
-
-    # Request the page
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-
-    # Parse the page content
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Parse the content to extract proposals from all tables
-    tables = soup.find_all('table')  # Find all tables
-    data = []
-    headers = None
-
-    # Find all titles (topics) corresponding to tables
-    topics = soup.find_all('span', class_='accordion__title-text')
-    for topic, table in zip(topics, tables):
-        rows = table.find_all('tr')
-        if not rows:
-            continue  # Skip empty tables
-
-        # Assuming first row is headers
-        current_headers = [header.get_text(strip=True) for header in rows[0].find_all('th')]
-        
-        if headers is None:  # Set headers only once
-            headers = current_headers
-        
-        topic_text = topic.get_text(strip=True)
-
-        for row in rows[1:]:
-            columns = row.find_all('td')
-            if len(columns) != len(headers):
-                continue  # Skip rows that do not match the header length
-
-            if "Instrument/ Mode" not in headers:
-                instrument_mode = columns[headers.index("Instrument/Mode")].get_text(strip=True).replace('\n', '').replace('\r', '').replace(' ', '')
-            else:
-                instrument_mode = columns[headers.index("Instrument/ Mode")].get_text(strip=True).replace('\n', '').replace('\r', '').replace(' ', '')
-            if "NIRSpec/MOS" in instrument_mode:
-                row_data = [col.get_text(strip=True) for col in columns]
-                row_data.append(topic_text)  # Add the topic text to the row data
-                row_data.append(cycle_number)  # Add the cycle number to the row data
-                data.append(row_data)
+    logger.info("Extracting info for %s...", cycle_number)
 
-    return data, headers
+    return _fetch_and_parse(
+        url, client, f"GO:{cycle_number}",
+        lambda content, keep_all, metrics: parse_basic_info_GO(content, cycle_number, parser, keep_all, metrics),
+        GO_TABLES, store, f"GO {cycle_number}", GO_EXTRA_HEADERS,
+    )
 
 
+def parse_basic_info_GO(content, cycle_number, parser="auto", keep_all=False, metrics=None):
+    """
+    Parse the NIRSpec/MOS rows out of the HTML of a jwst GO cycle page
+    ** The parsing half of extract_basic_info_from_GO, usable on saved copies of the page **
+
+    Args:
+        content (bytes or str): HTML of the page
+        cycle_number (str): Cycle number of the proposals
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        keep_all (bool): Keep every row, not only NIRSpec/MOS ones
+        metrics (RunMetrics): Where parse times and row counts are recorded, the process-wide metrics by default
+    Returns:
+        data (list): List of lists containing the extracted data
+        headers (list): List of headers
+    """
+    extracted = extract_tables(content, GO_ALL_TABLES if keep_all else GO_TABLES, parser, metrics)
+    data = [values + [topic, cycle_number] for _, topic, values in extracted.rows]
+    return data, extracted.headers
+
 
 
-def get_observation_status(proposal_id, retries=3):
+
+def get_observation_status(proposal_id, retries=3, client=None, parser="auto", store=None, hedge=False,
+                           registry=None):
     """
     Get the jwst observation status for a given Proposal ID
     ** Specifically, this function fetches the NIRSpec/MOS data from the tables on the page **
 
     Args:
         proposal_id (str): JWST Proposal ID to fetch data for
-        retries (int): Number of retries in case of connection errors
-    """
-    print(f"Fetching status for Proposal ID: {proposal_id}")
-
-    url = f"https://www.stsci.edu/cgi-bin/get-visit-status?id={proposal_id}&markupFormat=html&observatory=JWST&pi=1"
-    session = requests.Session()
-    attempt = 0
-    while attempt < retries:
-        try:
-            response = session.get(url, timeout=60)
-            response.raise_for_status()  # Raise an error for bad status codes
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find all tables with observation status
-            tables = soup.find_all("table")
-            if not tables:
-                print(f"No tables found for Proposal ID {proposal_id}")
-                return [], []  # Return two empty lists if no tables are found
-            
-            all_status_data = []
-            all_headers = []  # Initialize as a list to maintain order
-            
-            for table in tables:
-                # Get all rows in the table
-                rows = table.find_all('tr')
-                
-                # Parse the table headers (first row)
-                headers = [header.get_text(strip=True) for header in rows[0].find_all('td')]
-                if headers:  # Ensure headers are not empty
-                    all_headers.extend([header for header in headers if header not in all_headers])  # Add only new headers
-                    print(f"Headers: {headers}")  # Debug: Output the headers
-                
-                    # Locate the "Template" column index
-                    template_index = headers.index("Template") if "Template" in headers else -1
-                    
-                    # Parse the rows in the table (skip header)
-                    rows = rows[1:]  # Skip the header row
-                    print(f"Number of rows found: {len(rows)}")  # Debug: Output the number of rows found
-                    
-                    for row in rows:
-                        columns = row.find_all('td')
-                        
-                        if len(columns) != len(headers):
-                            continue  # Skip rows that don't match the header length
-                        
-                        row_data = [col.get_text(strip=True) for col in columns]
-                        print(f"Row data: {row_data}")  # Debug: Output the data in this row
-                        
-                        # Check if the "Template" matches "NIRSpec MultiObject Spectroscopy"
-                        if template_index != -1 and "NIRSpec MultiObject Spectroscopy" in row_data[template_index]:
-                            row_dict = dict(zip(headers, row_data))  # Map header to row data
-                            all_status_data.append(row_dict)
-            
-            return all_status_data, all_headers
-        
-        except (requests.ConnectionError, requests.Timeout) as e:
-            print(f"Connection error for Proposal ID {proposal_id}: {e}. Retrying...")
-            attempt += 1
-            time.sleep(5)  # Wait before retrying
-    
-    print(f"Failed to fetch data for Proposal ID {proposal_id} after {retries} retries.")
-    return [], []  # Return two empty lists in case of failure
+        retries (int): Number of retries in case of connection errors, timeouts, 429 or 5xx
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        store (ObservationStore): If given, every visit row (any template) is kept in it
+        hedge (bool): Send a backup request when the page is slower than the p95 latency (see StsciClient.hedged_get)
+        registry (StatusRegistry): Per-run registry, a proposal already fetched (or being fetched)
+            through it is not requested again and its result is shared
+    """
+    if registry is not None:
+        return registry.run(proposal_id, partial(get_observation_status, proposal_id, retries, client, parser,
+                                                 store, hedge))
+
+    logger.debug("Fetching status for Proposal ID: %s", proposal_id)
+
+    url = STATUS_URL.format(proposal_id=proposal_id)
+    client = client or get_default_client()
+    try:
+        # Retries connection errors, timeouts, 429 and 5xx with backoff (see RetryPolicy)
+        response = client.fetch(url, retries=retries, hedge=hedge)
+    except requests.RequestException as e:
+        logger.warning("Failed to fetch data for Proposal ID %s: %s", proposal_id, e)
+        client.metrics.inc("status_fetch_total", result="failed")
+        return [], []  # Return two empty lists in case of failure
+
+    # Page unchanged since the last run (304), reuse its parse result
+    parse_key = "observation_status:all" if store is not None else "observation_status"
+    cached = client.load_parsed(response, parse_key)
+    if cached is not None:
+        all_status_data, all_headers = cached
+    else:
+        all_status_data, all_headers = parse_observation_status(response.content, parser, store is not None,
+                                                                client.metrics)
+        if not all_headers:
+            logger.info("No status tables found for Proposal ID %s", proposal_id)
+            client.metrics.inc("status_fetch_total", result="empty")
+            return [], []  # Return two empty lists if no tables are found
+        client.store_parsed(response, parse_key, [all_status_data, all_headers])
+    client.metrics.inc("status_fetch_total", result="ok")
+
+    if store is not None:
+        store.put_visits(proposal_id, all_status_data, all_headers)
+        all_status_data = [row for row in all_status_data
+                           if STATUS_TABLES.predicate(row.get("Template", ""))]
+    return all_status_data, all_headers
+
+
+def parse_observation_status(content, parser="auto", keep_all=False, metrics=None):
+    """
+    Parse the NIRSpec/MOS visit rows out of the HTML of a get-visit-status page
+    ** The parsing half of get_observation_status, usable on saved copies of the page **
+
+    Args:
+        content (bytes or str): HTML of the page
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        keep_all (bool): Keep every visit, not only NIRSpec MultiObject Spectroscopy ones
+        metrics (RunMetrics): Where parse times and row counts are recorded, the process-wide metrics by default
+    Returns:
+        all_status_data (list): List of row dicts, one per NIRSpec MultiObject Spectroscopy visit
+        all_headers (list): Headers of all tables, empty if the page has no tables
+    """
+    extracted = extract_tables(content, STATUS_ALL_TABLES if keep_all else STATUS_TABLES, parser, metrics)
+    all_status_data = []
+    log_rows = rows_logger.isEnabledFor(logging.DEBUG)  # Only while capture_debug_rows is on
+    for headers, _, values in extracted.rows:
+        if log_rows:
+            rows_logger.debug("Row data: %s", values)
+        all_status_data.append(dict(zip(headers, values)))  # Map header to row data
+    return all_status_data, extracted.all_headers
+
+
+async def fetch_observation_statuses(proposal_ids, concurrency=8, retries=3, client=None, journal=None, store=None,
+                                     hedge=False, registry=None):
+    """
+    Get the jwst observation status for many Proposal IDs concurrently
+    ** Async counterpart of get_observation_status, at most `concurrency` requests are in flight **
+
+    In a notebook: statuses = await fetch_observation_statuses(df['ID'])
+    In a script:   statuses = asyncio.run(fetch_observation_statuses(df['ID']))
+
+    With a journal, every finished proposal is appended to it right away and proposals
+    already in it are not fetched again, so an interrupted run can simply be restarted.
+
+    Args:
+        proposal_ids (iterable): JWST Proposal IDs to fetch data for
+        concurrency (int): Maximum number of simultaneous requests to www.stsci.edu
+        retries (int): Number of retries in case of connection errors, timeouts, 429 or 5xx
+        client (StsciClient): Shared HTTP client, its pool_size should be >= concurrency
+        journal (StatusJournal): Checkpoint journal to resume from and append to
+        store (ObservationStore): If given, every visit row (any template) is kept in it and it is saved at the end
+        hedge (bool): Hedge slow requests with a backup request (see StsciClient.hedged_get)
+        registry (StatusRegistry): Per-run registry shared with other calls, a new one by default.
+            IDs that normalize to the same proposal (1433, "1433", 1433.0) are fetched once
+    Returns:
+        results (dict): {proposal_id: (status_data, headers)} in the order of proposal_ids
+    """
+    proposal_ids = list(dict.fromkeys(proposal_ids))  # Drop duplicates, keep order
+    pending_ids = journal.pending_ids(proposal_ids) if journal is not None else proposal_ids
+    if journal is not None and len(pending_ids) < len(proposal_ids):
+        logger.info("Resuming: %d proposals already in %s", len(proposal_ids) - len(pending_ids), journal.path)
+    if not pending_ids:
+        return {proposal_id: journal.get(proposal_id) for proposal_id in proposal_ids}
+
+    client = client or get_default_client()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+    registry = registry if registry is not None else StatusRegistry()
+    fetch = partial(get_observation_status, retries=retries, client=client, store=store, hedge=hedge,
+                    registry=registry)
+
+    # get_observation_status is blocking, so every request runs on its own worker thread
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def fetch_one(proposal_id):
+            async with semaphore:
+                result = await loop.run_in_executor(executor, fetch, proposal_id)
+            progress.update(failed=not result[1])  # No headers: fetch failed or page without tables
+            if journal is not None:
+                journal.append(proposal_id, *result)  # Checkpoint as soon as it is done
+            return result
+
+        progress = ProgressLogger(logger, "Status", total=len(pending_ids))
+        results = await asyncio.gather(*(fetch_one(proposal_id) for proposal_id in pending_ids))
+        progress.finish()
+    if store is not None:
+        store.save()
+
+    fetched = dict(zip(pending_ids, results))
+    return {proposal_id: fetched[proposal_id] if proposal_id in fetched else journal.get(proposal_id)
+            for proposal_id in proposal_ids}
+
+
+async def refresh_observation_statuses(proposal_ids, cache=None, concurrency=8, retries=3, client=None):
+    """
+    Incrementally refresh the jwst observation status of many Proposal IDs
+    ** Only proposals whose cached visit rows are missing or stale are fetched again **
+
+    How long rows stay fresh depends on their status (see StatusFreshnessPolicy): programs
+    whose visits are all Archived are re-checked rarely, programs in Implementation or
+    with a future plan window often.
+
+    e.g. statuses = await refresh_observation_statuses(df['ID'], StatusCache('status_cache.json'))
+
+    Args:
+        proposal_ids (iterable): JWST Proposal IDs to get the status for
+        cache (StatusCache): Cache of parsed visit rows, saved after the refresh
+        concurrency (int): Maximum number of simultaneous requests to www.stsci.edu
+        retries (int): Number of retries in case of connection errors, timeouts, 429 or 5xx
+        client (StsciClient): Shared HTTP client
+    Returns:
+        results (dict): {proposal_id: (status_data, headers)}, from the cache where still fresh
+    """
+    cache = cache if cache is not None else StatusCache()
+    proposal_ids = list(dict.fromkeys(proposal_ids))
+    stale_ids = cache.stale_ids(proposal_ids)
+    logger.info("Refreshing %d of %d proposals, the rest are up to date", len(stale_ids), len(proposal_ids))
+
+    fetched = await fetch_observation_statuses(stale_ids, concurrency, retries, client)
+    for proposal_id, (status_data, headers) in fetched.items():
+        cache.put(proposal_id, status_data, headers)
+    cache.save()
+
+    results = {}
+    for proposal_id in proposal_ids:
+        cached = cache.get(proposal_id)
+        results[proposal_id] = cached if cached is not None else fetched.get(proposal_id, ([], []))
+    return results
+
+def build_status_table(basic_df, status_records, id_column=None, metrics=None):
+    """
+    Join the visit status of every proposal to its basic info, with one keyed merge
+    ** Gives the same table as the notebook's iterrows/dict.update loop, one row per visit **
+
+    e.g. statuses = await fetch_observation_statuses(df['ID'])
+         build_status_table(df, statuses).to_csv('NIRSpec_MOS_pps_GO_with_detailed_status.csv', index=False)
+
+    Args:
+        basic_df (pd.DataFrame): Basic info, one row per proposal (e.g. NIRSpec_MOS_pps_GO.csv)
+        status_records (dict or iterable): {proposal_id: (status_data, headers)} as returned by
+            fetch_observation_statuses / refresh_observation_statuses, or VisitRows from iter_observation_status
+        id_column (str): Proposal ID column of basic_df, "ID" or "PID" (DDT) is detected if None
+        metrics (RunMetrics): Where the merge time is recorded, e.g. client.metrics, the process-wide metrics by default
+    Returns:
+        df_status (pd.DataFrame): basic_df columns followed by the status headers, proposals without
+            visits are left out. Status values win over basic values in columns both have.
+    """
+    with (metrics if metrics is not None else get_metrics()).timer("stage_seconds", stage="merge"):
+        return _build_status_table(basic_df, status_records, id_column)
+
+
+def _build_status_table(basic_df, status_records, id_column):
+    if id_column is None:
+        id_column = "ID" if "ID" in basic_df.columns else "PID"
+
+    # Flatten the status records into one visit table, keyed by the proposal ID as text
+    if isinstance(status_records, dict):
+        records = [(proposal_id, headers, status_data)
+                   for proposal_id, (status_data, headers) in status_records.items()]
+    else:
+        records = {}
+        for row in status_records:
+            headers, status_data = records.setdefault(row.proposal_id, ([], []))
+            headers.extend([header for header in row.fields if header not in headers])
+            status_data.append(row.fields)
+        records = [(proposal_id, headers, status_data) for proposal_id, (headers, status_data) in records.items()]
+
+    keys = []
+    visits = []
+    headers_by_key = {}
+    for proposal_id, headers, status_data in records:
+        key = str(proposal_id)
+        headers_by_key.setdefault(key, []).extend(headers)
+        keys.extend([key] * len(status_data))
+        visits.extend(status_data)
+    visit_df = pd.DataFrame.from_records(visits)
+    visit_df.insert(0, "_key", pd.Series(keys, dtype=object))  # Text even without any visit
+    visit_df["_visit"] = range(len(visit_df))
+
+    # Status headers in order of first appearance, following the order of basic_df
+    final_headers = list(basic_df.columns)
+    keys_with_visits = set(keys)
+    for key in basic_df[id_column].astype(str).unique():
+        if key in keys_with_visits:
+            final_headers.extend([header for header in headers_by_key[key] if header not in final_headers])
+
+    basic = basic_df.assign(_key=basic_df[id_column].astype(str), _row=range(len(basic_df)))
+    merged = basic.merge(visit_df, on="_key", how="inner", suffixes=("", "_status"))
+    merged = merged.sort_values(["_row", "_visit"], kind="stable")
+
+    # Columns present in both: the status value overrides the basic one when the visit has it
+    for column in basic_df.columns:
+        if column + "_status" in merged.columns:
+            merged[column] = merged[column + "_status"].where(merged[column + "_status"].notna(), merged[column])
+
+    status_columns = [header for header in final_headers if header not in basic_df.columns]
+    for column in status_columns:
+        if column not in merged.columns:
+            merged[column] = ""
+    merged[status_columns] = merged[status_columns].fillna("")
+    return merged[final_headers].reset_index(drop=True)
+
 
 def check_csv(basic_info_file,status_file):
     """
     Check if all the proposals in the basic_info_file have been checked for status.
+    Returns the set of missing proposal IDs (empty if all were checked), which is also logged.
     """
     df1 = pd.read_csv(basic_info_file)
     df2 = pd.read_csv(status_file)
     df1id = df1['ID'].tolist()
     df2id = df2['ID'].tolist()
-    if set(df1id).issubset(set(df2id)):
-        print('All checked')
+    missing = set(df1id) - set(df2id)
+    if not missing:
+        logger.info('All checked')
     else:
-        print('Not all checked, missing:')
-        print(set(df1id)-set(df2id))
+        logger.warning('Not all checked, missing: %s', missing)
+    return missing
 
 
-def extract_basic_info_from_GTO(url):
+def extract_basic_info_from_GTO(url, client=None, parser="auto", store=None):
     """
     Extract data from a SINGLE jwst GTO page 
     ** Specifically, this function extracts NIRSpec/MOS information from the tables on the page **
+
+    Args:
+        url (str): URL of the page to extract data from
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        store (ObservationStore): If given, every row of the page is kept in it under "GTO"
     """
-    print("Extracting info for GTO...")
-
-    response = requests.get(url)
-    response.raise_for_status() 
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    tables = soup.find_all('table')  # Find all tables
-    data = []
-    headers = None
-
-    for table in tables:
-        rows = table.find_all('tr')
-        if not rows:
-            continue  # Skip empty tables
-
-        current_headers = [header.get_text(strip=True) for header in rows[0].find_all('th')]
-        
-        if headers is None:  # Set headers only once
-            headers = current_headers
-        
-        for row in rows[1:]:
-            columns = row.find_all('td')
-            if len(columns) != len(headers):
-                continue  # Skip rows that do not match the header length
-
-            if "Instrument/Mode" in headers:
-                instrument_mode = columns[headers.index("Instrument/Mode")].get_text(strip=True)
-            elif "Instrument/ Mode" in headers:
-                instrument_mode = columns[headers.index("Instrument/ Mode")].get_text(strip=True)
-            else:
-                continue
-
-            if "NIRSpec/MOS" in instrument_mode:
-                row_data = [col.get_text(strip=True) for col in columns]
-
-                # Programs with "AR" icon have components that have no exclusive access period
-                # and can be used as a basis for GO Archival  Research (AR) Proposals.
-                if "AR?" in headers: 
-                    ar_index = headers.index("AR?")
-                    if columns[ar_index].find('img'): 
-                        row_data[ar_index] = "AR"
-                
-                data.append(row_data)
+    logger.info("Extracting info for GTO...")
+
+    return _fetch_and_parse(
+        url, client, "GTO",
+        lambda content, keep_all, metrics: parse_basic_info_GTO(content, parser, keep_all, metrics),
+        GTO_TABLES, store, "GTO",
+    )
 
-    return data, headers
 
+def parse_basic_info_GTO(content, parser="auto", keep_all=False, metrics=None):
+    """
+    Parse the NIRSpec/MOS rows (every row with keep_all) out of the HTML of the jwst GTO page
+    ** The parsing half of extract_basic_info_from_GTO, usable on saved copies of the page **
+    """
+    extracted = extract_tables(content, GTO_ALL_TABLES if keep_all else GTO_TABLES, parser, metrics)
+    return [values for _, _, values in extracted.rows], extracted.headers
 
 
-def extract_basic_info_from_DDT(url):
+
+def extract_basic_info_from_DDT(url, client=None, parser="auto", store=None):
     """
     Extract data from a SINGLE jwst DDT page 
     ** Specifically, this function extracts NIRSpec information from the tables on the page **
+
+    Args:
+        url (str): URL of the page to extract data from
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        store (ObservationStore): If given, every row of the page is kept in it under "DDT"
+    """
+    logger.info("Extracting info for DDT...")
+
+    return _fetch_and_parse(
+        url, client, "DDT",
+        lambda content, keep_all, metrics: parse_basic_info_DDT(content, parser, keep_all, metrics),
+        DDT_TABLES, store, "DDT",
+    )
+
+
+def parse_basic_info_DDT(content, parser="auto", keep_all=False, metrics=None):
+    """
+    Parse the NIRSpec rows (every row with keep_all) out of the HTML of the jwst DDT page
+    ** The parsing half of extract_basic_info_from_DDT, usable on saved copies of the page **
+    """
+    extracted = extract_tables(content, DDT_ALL_TABLES if keep_all else DDT_TABLES, parser, metrics)
+    return [values for _, _, values in extracted.rows], extracted.headers
+
+
+def iter_basic_info(source, client=None, parser="auto", keep_all=False):
+    """
+    Stream the basic info of a listing page, one ProgramRow at a time
+    ** Rows are yielded while the tables are read, nothing is collected **
+
+    e.g. for row in iter_basic_info(Source("DDT", url)):
+             print(row.proposal_id, row.fields["Title"])
+
+    Args:
+        source (Source): Page to read
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        keep_all (bool): Yield every row, not only the NIRSpec/MOS (NIRSpec for DDT) ones
+    Yields:
+        row (ProgramRow): source name, proposal ID and {header: value} of one program
+    """
+    specs = {"GO": (GO_TABLES, GO_ALL_TABLES), "GTO": (GTO_TABLES, GTO_ALL_TABLES), "DDT": (DDT_TABLES, DDT_ALL_TABLES)}
+    if source.kind not in specs:
+        raise ValueError(f"Unknown source kind: {source.kind}")
+    spec = specs[source.kind][1 if keep_all else 0]
+
+    client = client or get_default_client()
+    response = client.fetch(source.url)
+
+    for headers, topic, values in iter_table_rows(response.content, spec, parser, client.metrics):
+        fields = dict(zip(headers, values))
+        if source.kind == "GO":
+            fields.update(zip(GO_EXTRA_HEADERS, [topic, source.cycle]))
+        yield ProgramRow(source.name, fields.get("ID", fields.get("PID")), fields)
+
+
+def iter_observation_status(proposal_ids, concurrency=8, retries=3, client=None, registry=None):
+    """
+    Stream the NIRSpec/MOS visits of many proposals, one VisitRow at a time
+    ** Proposals are fetched concurrently and their rows yielded as soon as each one finishes **
+
+    At most 2 x concurrency proposals are pending at any time, so memory stays flat however
+    long proposal_ids is. Rows come out in completion order, not in the order of proposal_ids.
+
+    Args:
+        proposal_ids (iterable): JWST Proposal IDs, may be a generator
+        concurrency (int): Maximum number of simultaneous requests to www.stsci.edu
+        retries (int): Number of retries in case of connection errors, timeouts, 429 or 5xx
+        client (StsciClient): Shared HTTP client, its pool_size should be >= concurrency
+        registry (StatusRegistry): Per-run registry, proposals it already holds are served from it
+    Yields:
+        row (VisitRow): proposal ID and {header: value} of one visit
+    """
+    client = client or get_default_client()
+    proposal_ids = iter(proposal_ids)
+    seen = set()
+    progress = ProgressLogger(logger, "Status")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        while True:
+            # Keep the pool topped up without reading the whole ID list ahead
+            while len(pending) < 2 * concurrency:
+                proposal_id = next(proposal_ids, None)
+                if proposal_id is None:
+                    break
+                key = normalize_proposal_id(proposal_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+                future = executor.submit(get_observation_status, proposal_id, retries, client, registry=registry)
+                pending[future] = proposal_id
+            if not pending:
+                progress.finish()
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                proposal_id = pending.pop(future)
+                status_data, headers = future.result()
+                progress.update(failed=not headers)
+                for fields in status_data:
+                    yield VisitRow(proposal_id, fields)
+
+
+def write_rows_csv(rows, path, fieldnames):
+    """
+    Write streamed rows to a CSV file as they arrive
+    ** e.g. write_rows_csv(iter_basic_info(source), 'NIRSpec_MOS_pps_GTO.csv', headers) **
+
+    Args:
+        rows (iterable): ProgramRow / VisitRow (or plain dicts)
+        path (str): CSV file to write
+        fieldnames (list): CSV columns, fields not in the list are left out and missing ones are empty
+    Returns:
+        n_rows (int): Number of rows written
+    """
+    n_rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            fields = row if isinstance(row, dict) else {"ID": row.proposal_id, **row.fields}
+            writer.writerow(fields)
+            n_rows += 1
+    return n_rows
+
+
+def extract_basic_info(source, client=None, parser="auto", store=None):
+    """
+    Extract the basic info of any listing page, dispatching on source.kind
+    ** GO headers come back with the "Topic" and "GO Cycle" columns included **
+
+    Args:
+        source (Source): Page to read
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        store (ObservationStore): If given, every row of the page is kept in it
+    Returns:
+        data (list): List of lists containing the extracted data
+        headers (list): List of headers
+    """
+    if source.kind == "GO":
+        data, headers = extract_basic_info_from_GO(source.url, source.cycle, client, parser, store)
+        return data, (headers or []) + GO_EXTRA_HEADERS
+    if source.kind == "GTO":
+        return extract_basic_info_from_GTO(source.url, client, parser, store)
+    if source.kind == "DDT":
+        return extract_basic_info_from_DDT(source.url, client, parser, store)
+    raise ValueError(f"Unknown source kind: {source.kind}")
+
+
+async def harvest(sources=DEFAULT_SOURCES, concurrency=8, client=None, journal=None, store=None, hedge=False,
+                  registry=None, history=None):
+    """
+    Harvest the NIRSpec/MOS programs and visit status of several listing pages in one go
+    ** All listing pages are fetched at once, then every distinct program goes through one status pool **
+
+    e.g. df = await harvest()                                   # every GO cycle, GTO and DDT
+         df.to_csv('NIRSpec_MOS_pps_all_with_detailed_status.csv', index=False)
+
+    A program listed on several pages (or twice on one page) is fetched only once, its visits
+    are joined to each of its listings. Columns that only differ in name between the pages
+    are merged (see COLUMN_SYNONYMS): ID, Title, PI and Instruments.
+
+    Args:
+        sources (list): Source pages to read, see DEFAULT_SOURCES
+        concurrency (int): Maximum number of simultaneous requests to www.stsci.edu
+        client (StsciClient): Shared HTTP client, defaults to the module-wide client
+        journal (StatusJournal): Checkpoint journal for the status fetches
+        store (ObservationStore): If given, every program and visit row is kept in it
+        hedge (bool): Hedge slow status requests (see StsciClient.hedged_get)
+        registry (StatusRegistry): Per-run registry of status fetches, a new one by default
+        history (StatusHistory): If given, the visit rows are appended to it as a new snapshot
+    Returns:
+        df_status (pd.DataFrame): One row per visit, with a leading "source" column (e.g. "GO Cycle 2")
+    """
+    client = client or get_default_client()
+    loop = asyncio.get_running_loop()
+
+    # Listing pages, all at once
+    with client.metrics.timer("stage_seconds", stage="listing"), \
+            ThreadPoolExecutor(max_workers=max(1, len(sources))) as executor:
+        pages = await asyncio.gather(*(
+            loop.run_in_executor(executor, partial(extract_basic_info, source, client, store=store))
+            for source in sources
+        ))
+
+    frames = []
+    for source, (data, headers) in zip(sources, pages):
+        if data:
+            frame = pd.DataFrame(data, columns=headers).rename(columns=COLUMN_SYNONYMS)
+            frame.insert(0, "source", source.name)
+            frames.append(frame)
+    if not frames:
+        logger.warning("No NIRSpec/MOS info found.")
+        return pd.DataFrame(columns=["source", "ID"])
+    basic_df = pd.concat(frames, ignore_index=True)
+
+    # Every distinct program once, through one shared pool
+    basic_df["ID"] = basic_df["ID"].map(normalize_proposal_id)
+    proposal_ids = list(dict.fromkeys(basic_df["ID"]))
+    logger.info("%d listings of %d distinct programs from %d pages", len(basic_df), len(proposal_ids), len(sources))
+    with client.metrics.timer("stage_seconds", stage="status"):
+        statuses = await fetch_observation_statuses(proposal_ids, concurrency, client=client, journal=journal,
+                                                    store=store, hedge=hedge, registry=registry)
+    if history is not None:
+        changes = history.append_snapshot(statuses)
+        logger.info("%d visits added, removed or changed since the last snapshot", len(changes))
+    return build_status_table(basic_df, statuses, id_column="ID", metrics=client.metrics)
+
+
+def load_sources(path):
+    """
+    Read a list of Source from a JSON file, e.g. [{"kind": "GO", "url": "...", "cycle": "Cycle 1"}, {"kind": "DDT", "url": "..."}]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [Source(**entry) for entry in json.load(f)]
+
+
+def main(argv=None):
+    """
+    Command line entry point: harvest every source into one CSV
+
+    e.g. python get_nirspec_mos_info.py -o NIRSpec_MOS_pps_all_with_detailed_status.csv --concurrency 8
     """
-    print("Extracting info for DDT...")
-
-    response = requests.get(url)
-    response.raise_for_status() 
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    tables = soup.find_all('table')  # Find all tables
-    data = []
-    headers = None
-
-    for table in tables:
-        rows = table.find_all('tr')
-        if not rows:
-            continue  # Skip empty tables
-
-        current_headers = [header.get_text(strip=True) for header in rows[0].find_all('th')]
-        
-        if headers is None:  # Set headers only once
-            headers = current_headers
-        
-        for row in rows[1:]:
-            columns = row.find_all('td')
-            if len(columns) != len(headers):
-                continue  # Skip rows that do not match the header length
-
-            if "Instruments" in headers:
-                instrument_mode = columns[headers.index("Instruments")].get_text(strip=True)
-            else:
-                continue
-
-            if "NIRSpec" in instrument_mode:
-                row_data = [col.get_text(strip=True) for col in columns]
-                data.append(row_data)
-
-    return data, headers
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Harvest JWST NIRSpec/MOS programs and their visit status")
+    arg_parser.add_argument("-o", "--output", default="NIRSpec_MOS_pps_all_with_detailed_status.csv",
+                            help="CSV file to write")
+    arg_parser.add_argument("--sources", help="JSON list of sources (kind, url, cycle), defaults to GO 1-3, GTO and DDT")
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="simultaneous status requests")
+    arg_parser.add_argument("--journal", help="JSONL checkpoint journal, to resume an interrupted harvest")
+    arg_parser.add_argument("--hedge", action="store_true", help="hedge slow status requests")
+    arg_parser.add_argument("--db", help="also keep every program and visit row in this SQLite file "
+                                         "(see sqlite_store.py), updated in place on later runs")
+    arg_parser.add_argument("--base-url", help="send every request to this server instead of www.stsci.edu, "
+                                               "e.g. http://127.0.0.1:8000 (see stsci_stub_server.py)")
+    arg_parser.add_argument("--history", help="append the visit status to this history directory and log "
+                                              "what changed since the last run (see status_history.py)")
+    arg_parser.add_argument("--parquet", help="also write the table as a Parquet dataset partitioned by source "
+                                              "and cycle in this directory (needs pyarrow, see columnar_output.py)")
+    arg_parser.add_argument("--arrow", help="also write the table as an Arrow IPC file (needs pyarrow)")
+    arg_parser.add_argument("--metrics", help="write the run's metrics to this file (.prom for Prometheus text, "
+                                              "JSON otherwise)")
+    verbosity = arg_parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-v", "--verbose", action="store_true", help="also log every proposal fetched")
+    verbosity.add_argument("-q", "--quiet", action="store_true", help="only log warnings")
+    args = arg_parser.parse_args(argv)
+
+    configure_logging("DEBUG" if args.verbose else "WARNING" if args.quiet else "INFO")
+
+    sources = load_sources(args.sources) if args.sources else DEFAULT_SOURCES
+    journal = StatusJournal(args.journal) if args.journal else None
+    store = SqliteObservationStore(args.db) if args.db else None
+    history = StatusHistory(args.history) if args.history else None
+    default_client = get_default_client()
+    client = StsciClient(pool_size=max(16, args.concurrency), cache=default_client.cache,
+                         base_url=args.base_url or default_client.base_url)
+    df_status = asyncio.run(harvest(sources, args.concurrency, client, journal, store, hedge=args.hedge,
+                                    history=history))
+    if store is not None:
+        store.close()
+    df_status.to_csv(args.output, index=False)
+    if args.parquet:
+        write_parquet(df_status, args.parquet)
+    if args.arrow:
+        write_arrow(df_status, args.arrow)
+    print(f"{len(df_status)} visits written to {args.output}")
+    print(client.metrics.summary())
+    if args.metrics:
+        client.metrics.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax is optional
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (only needed as a BeautifulSoup tree builder)
+    HAS_LXML = True
+except ImportError:  # lxml is optional
+    HAS_LXML = False
+
+
+class SoupBackend:
+    """
+    HTML backend on top of BeautifulSoup, with the "html.parser" or "lxml" tree builder
+    """
+
+    def __init__(self, features="html.parser"):
+        self.name = features
+        self.features = features
+
+    def parse(self, content):
+        return BeautifulSoup(content, self.features)
+
+    def tables(self, doc):
+        return doc.find_all('table')
+
+    def rows(self, table):
+        return table.find_all('tr')
+
+    def cells(self, row, tag):
+        return row.find_all(tag)
+
+    def text(self, cell):
+        return cell.get_text(strip=True)
+
+    def has_img(self, cell):
+        return cell.find('img') is not None
+
+    def span_texts(self, doc, class_name):
+        return [span.get_text(strip=True) for span in doc.find_all('span', class_=class_name)]
+
+
+class SelectolaxBackend:
+    """
+    HTML backend on top of selectolax (lexbor engine), several times faster than BeautifulSoup
+    """
+
+    name = "selectolax"
+
+    def parse(self, content):
+        if isinstance(content, bytes):
+            # Decode exactly like BeautifulSoup does, so both backends see the same text
+            content = UnicodeDammit(content, is_html=True).unicode_markup
+        return LexborHTMLParser(content)
+
+    def tables(self, doc):
+        return doc.css('table')
+
+    def rows(self, table):
+        return table.css('tr')
+
+    def cells(self, row, tag):
+        return row.css(tag)
+
+    def text(self, cell):
+        return cell.text(deep=True, separator='', strip=True)
+
+    def has_img(self, cell):
+        return cell.css_first('img') is not None
+
+    def span_texts(self, doc, class_name):
+        return [span.text(deep=True, separator='', strip=True) for span in doc.css(f'span.{class_name}')]
+
+
+def available_backends():
+    """Names of the HTML backends that can be used here, fastest first"""
+    names = []
+    if LexborHTMLParser is not None:
+        names.append("selectolax")
+    if HAS_LXML:
+        names.append("lxml")
+    names.append("html.parser")
+    return names
+
+
+def get_backend(parser="auto"):
+    """
+    Return the HTML backend for a parser name
+    ** "auto" picks the fastest installed one: selectolax, then lxml, then html.parser **
+
+    Asking for a backend whose package is missing falls back to html.parser.
+
+    Args:
+        parser (str): "auto", "selectolax", "lxml" or "html.parser"
+    Returns:
+        backend (SoupBackend or SelectolaxBackend): Backend used by the extractors
+    """
+    if parser == "auto":
+        parser = available_backends()[0]
+    elif parser not in ("selectolax", "lxml", "html.parser"):
+        raise ValueError(f"Unknown parser backend: {parser}")
+
+    if parser == "selectolax" and LexborHTMLParser is not None:
+        return SelectolaxBackend()
+    if parser == "lxml" and HAS_LXML:
+        return SoupBackend("lxml")
+    return SoupBackend("html.parser")
@@ -0,0 +1,125 @@
+"""
+Interval index of the visits' plan windows, for date-range questions without re-reading any text
+
+The "Plan Windows" cells are split once (see status_store.parse_plan_windows) into day intervals
+held in sorted arrays, so "which MOS visits can execute between two dates" is two binary searches
+and one vectorized comparison over the candidates.
+
+e.g. statuses = await fetch_observation_statuses(df['ID'])
+     index = PlanWindowIndex.from_statuses(statuses)
+     index.visits_between("2025-04-01", "2025-04-30", template="NIRSpec MultiObject Spectroscopy")
+"""
+from datetime import date, datetime
+
+import numpy as np
+
+from status_store import normalize_proposal_id, parse_plan_windows
+
+
+def _day(value):
+    # Proleptic ordinal of a date, datetime or ISO text ("2025-04-16")
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+class PlanWindowIndex:
+    """
+    Static interval index of plan windows, one entry per (visit, window)
+    ** Built once from the visit rows, every query is O(log n + candidates) **
+
+    Windows are sorted by start day, next to the running maximum of their end days: the windows
+    overlapping [start, end] all lie between the first one whose running maximum reaches `start`
+    and the last one starting before `end`.
+
+    Args:
+        entries (iterable): (key, fields) of visit rows, key being (proposal ID, observation, visit)
+    """
+
+    def __init__(self, entries=()):
+        keys, rows, starts, ends = [], [], [], []
+        for key, fields in entries:
+            for window in parse_plan_windows(fields.get("Plan Windows")):
+                keys.append(key)
+                rows.append(fields)
+                starts.append(window.start.toordinal())
+                ends.append(window.end.toordinal())
+
+        order = np.argsort(np.asarray(starts, dtype=np.int64), kind="stable")
+        self.starts = np.asarray(starts, dtype=np.int64)[order]
+        self.ends = np.asarray(ends, dtype=np.int64)[order]
+        self.max_ends = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self.keys = [keys[i] for i in order]
+        self.rows = [rows[i] for i in order]
+
+    @classmethod
+    def from_statuses(cls, statuses):
+        """
+        Index of {proposal_id: (status_data, headers)}, as returned by fetch_observation_statuses
+        """
+        return cls(((normalize_proposal_id(proposal_id), row.get("Observation", ""), row.get("Visit", "")), row)
+                   for proposal_id, (status_data, _) in statuses.items() for row in status_data)
+
+    @classmethod
+    def from_frame(cls, df_status, id_column="ID"):
+        """
+        Index of a status table, as returned by harvest or build_status_table (or read from its CSV)
+        """
+        if "Plan Windows" not in df_status.columns:
+            return cls()
+        columns = [column for column in (id_column, "Observation", "Visit", "Status", "Template", "Plan Windows")
+                   if column in df_status.columns]
+        records = df_status[columns].fillna("").astype(str).to_dict("records")
+        return cls(((normalize_proposal_id(row[id_column]), row.get("Observation", ""), row.get("Visit", "")), row)
+                   for row in records)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _matching(self, start, end, template, status):
+        # Positions of the windows sharing at least one day with [start, end], of visits matching the filters
+        first_day, last_day = _day(start), _day(end)
+        low = int(np.searchsorted(self.max_ends, first_day, side="left"))
+        high = int(np.searchsorted(self.starts, last_day, side="right"))
+        if low >= high:
+            return []
+        positions = (low + np.flatnonzero(self.ends[low:high] >= first_day)).tolist()
+        if template is None and status is None:
+            return positions
+        matches = {}  # Template text -> contains `template`, there are only a few distinct ones
+        matching = []
+        for position in positions:
+            fields = self.rows[position]
+            if template is not None:
+                text = fields.get("Template", "")
+                if text not in matches:
+                    matches[text] = template in text
+                if not matches[text]:
+                    continue
+            if status is None or fields.get("Status") == status:
+                matching.append(position)
+        return matching
+
+    def windows_between(self, start, end, template=None, status=None):
+        """
+        Plan windows sharing at least one day with [start, end], both days included
+
+        Args:
+            start (date, datetime or str): First day, e.g. "2025-04-01"
+            end (date, datetime or str): Last day
+            template (str): Keep visits whose Template contains this text, None keeps all
+            status (str): Keep visits whose Status is exactly this, None keeps all
+        Returns:
+            windows (list): (visit key, first day, last day) by start day, one per matching window
+        """
+        return [(self.keys[position], date.fromordinal(int(self.starts[position])),
+                 date.fromordinal(int(self.ends[position])))
+                for position in self._matching(start, end, template, status)]
+
+    def visits_between(self, start, end, template=None, status=None):
+        """
+        Keys of the visits that can execute between two dates (a plan window overlaps [start, end])
+        """
+        return list(dict.fromkeys(self.keys[position] for position in self._matching(start, end, template, status)))
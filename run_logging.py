@@ -0,0 +1,168 @@
+"""
+Logging of the scraper: silent by default, rate-limited progress lines and an in-memory ring buffer of parsed rows
+
+Every module logs under the "jwst_program_extractor" logger, which has a NullHandler, so nothing is
+printed until configure_logging (or the application's own logging setup) asks for it. Parsed rows go
+to the separate "jwst_program_extractor.rows" logger, which never reaches the console: they are only
+kept, and only while a ring buffer is capturing them.
+
+e.g. configure_logging("INFO")          # progress lines and warnings, e.g. in the notebook
+     rows = capture_debug_rows(500)     # keep the last 500 parsed rows
+     statuses = await fetch_observation_statuses(df['ID'])
+     rows.messages()[-5:]
+"""
+from collections import deque
+import logging
+import sys
+import threading
+import time
+
+
+LOGGER_NAME = "jwst_program_extractor"
+ROWS_LOGGER_NAME = LOGGER_NAME + ".rows"
+
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+_rows_logger = logging.getLogger(ROWS_LOGGER_NAME)
+_rows_logger.propagate = False  # Rows only ever go to a RingBufferHandler
+_rows_logger.setLevel(logging.WARNING)
+
+
+def get_logger(name):
+    """Logger of a module, e.g. get_logger(__name__)"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def get_rows_logger():
+    """Logger of the parsed rows, check rows_logger.isEnabledFor(logging.DEBUG) once per page"""
+    return _rows_logger
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Logging handler keeping the last `capacity` records in memory, nothing is written anywhere
+    """
+
+    def __init__(self, capacity=1000, level=logging.DEBUG):
+        super().__init__(level)
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.buffer.append(record)
+
+    def records(self):
+        return list(self.buffer)
+
+    def messages(self):
+        return [record.getMessage() for record in list(self.buffer)]
+
+    def clear(self):
+        self.buffer.clear()
+
+    def stop(self):
+        """Stop capturing, the rows logger goes back to dropping rows"""
+        release_debug_rows(self)
+
+
+def capture_debug_rows(capacity=1000):
+    """
+    Start keeping the last `capacity` parsed rows in memory
+    ** Returns the RingBufferHandler holding them, call .stop() on it when done **
+    """
+    handler = RingBufferHandler(capacity)
+    _rows_logger.addHandler(handler)
+    _rows_logger.setLevel(logging.DEBUG)
+    return handler
+
+
+def release_debug_rows(handler):
+    _rows_logger.removeHandler(handler)
+    if not any(isinstance(other, RingBufferHandler) for other in _rows_logger.handlers):
+        _rows_logger.setLevel(logging.WARNING)
+
+
+_console_handler = None
+
+
+def configure_logging(level="INFO", stream=None, fmt="%(asctime)s %(levelname)s %(message)s"):
+    """
+    Print the scraper's log lines of `level` and above (progress lines are INFO, per-proposal lines DEBUG)
+    ** Calling it again replaces the previous console handler, configure_logging(None) silences it again **
+
+    Args:
+        level (str or int): "DEBUG", "INFO", "WARNING"... None removes the console handler
+        stream (file): Where to print, sys.stderr by default
+        fmt (str): logging format of the lines
+    Returns:
+        handler (logging.Handler): The console handler, None if removed
+    """
+    global _console_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _console_handler is not None:
+        logger.removeHandler(_console_handler)
+        _console_handler = None
+    if level is None:
+        logger.setLevel(logging.NOTSET)
+        return None
+
+    _console_handler = logging.StreamHandler(stream or sys.stderr)
+    _console_handler.setFormatter(logging.Formatter(fmt, "%H:%M:%S"))
+    logger.addHandler(_console_handler)
+    logger.setLevel(level)
+    return _console_handler
+
+
+class ProgressLogger:
+    """
+    Thread-safe progress counter logging one INFO line every `interval` seconds at most, plus a final one
+    ** Keeps the console quiet however many items go through **
+
+    e.g. progress = ProgressLogger(logger, "Status", total=len(proposal_ids))
+         progress.update()          # after each proposal, update(failed=True) if it failed
+         progress.finish()
+
+    Args:
+        logger (logging.Logger): Logger to write to
+        label (str): Start of every line, e.g. "Status"
+        total (int): Expected number of items, None if unknown
+        interval (float): Minimum number of seconds between two lines
+        unit (str): Name of the items
+    """
+
+    def __init__(self, logger, label, total=None, interval=5.0, unit="proposals"):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.unit = unit
+        self.done = 0
+        self.failed = 0
+        self._start = time.monotonic()
+        self._last = self._start
+        self._lock = threading.Lock()
+
+    def update(self, n=1, failed=False):
+        with self._lock:
+            self.done += n
+            self.failed += n if failed else 0
+            now = time.monotonic()
+            if now - self._last < self.interval or not self.logger.isEnabledFor(logging.INFO):
+                return
+            self._last = now
+            line = self._line(now)
+        self.logger.info(line)
+
+    def finish(self):
+        with self._lock:
+            line = self._line(time.monotonic())
+        self.logger.info(line + " (done)")
+
+    def _line(self, now):
+        elapsed = max(now - self._start, 1e-9)
+        rate = self.done / elapsed
+        line = f"{self.label}: {self.done}" + (f"/{self.total}" if self.total is not None else "") + f" {self.unit}"
+        if self.failed:
+            line += f", {self.failed} failed"
+        line += f", {rate:.1f}/s"
+        if self.total is not None and rate > 0 and self.done < self.total:
+            line += f", about {(self.total - self.done) / rate:.0f}s left"
+        return line
@@ -0,0 +1,211 @@
+"""
+Counters and latency histograms of a run, filled in by the HTTP client and the extractors
+
+e.g. from run_metrics import get_metrics
+     df = await harvest()
+     print(get_metrics().summary())
+     get_metrics().dump('harvest.prom')   # Prometheus text, or JSON for any other extension
+"""
+from contextlib import contextmanager
+import bisect
+import json
+import threading
+import time
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Bucketed histogram with count, sum, min and max, like a Prometheus histogram
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile (0-1) by linear interpolation inside its bucket, None if empty
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(max(lower + (upper - lower) * (rank - seen) / n, self.min), self.max)
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+                "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.counts))}
+
+
+class RunMetrics:
+    """
+    Thread-safe store of labelled counters and histograms
+    ** One object per run, shared by every worker thread **
+
+    Metrics recorded by the scraper (labels in braces):
+        http_requests_total{host, status}, http_errors_total{host, error}, http_retries_total{host, reason},
+        http_connections_total{host}, http_wire_bytes_total{host}, http_body_bytes_total{host},
+        http_request_seconds{host, phase}  phase is connect (DNS + TCP), tls, wait (until the headers),
+            download (the body) or total
+        http_cache_total{result}, parse_cache_total{result}  result is hit or miss
+        http_hedges_total{host, winner}
+        parse_seconds{page, step}  step is dom (building the tree) or extract (reading the rows)
+        rows_total{page, outcome}  outcome is kept, filtered (by the row filter) or ragged (wrong length)
+        status_fetch_total{result}  result is ok, empty or failed
+        stage_seconds{stage}  listing, status or merge
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}  # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: Histogram}
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the time spent in a with block, e.g. with metrics.timer("stage_seconds", stage="merge"):"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name, **labels):
+        """Sum of a counter over every series matching the given labels"""
+        with self._lock:
+            return sum(value for key, value in self.counters.get(name, {}).items()
+                       if all(item in key for item in labels.items()))
+
+    def histogram(self, name, **labels):
+        """Histogram of one series, None if nothing was observed"""
+        with self._lock:
+            return self.histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def hit_rate(self, name):
+        """Fraction of hits of a {result: hit/miss} counter, None if it was never counted"""
+        hits, misses = self.total(name, result="hit"), self.total(name, result="miss")
+        return hits / (hits + misses) if hits + misses else None
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "counters": {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                             for name, series in self.counters.items()},
+                "histograms": {name: [{"labels": dict(key), **histogram.to_dict()} for key, histogram in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=1)
+
+    def to_prometheus(self, prefix="stsci_"):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{prefix}{name}{_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip([repr(bound) for bound in histogram.buckets] + ["+Inf"], histogram.counts):
+                        cumulative += n
+                        lines.append(f"{prefix}{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                    lines.append(f"{prefix}{name}_sum{_labels(key)} {histogram.sum}")
+                    lines.append(f"{prefix}{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the metrics to a file, Prometheus text for .prom/.txt, JSON otherwise"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary(self):
+        """A few human-readable lines: requests, latency, bytes, retries, cache hit rates, rows"""
+        lines = [f"requests: {self.total('http_requests_total')}, errors: {self.total('http_errors_total')}, "
+                 f"retries: {self.total('http_retries_total')}, new connections: {self.total('http_connections_total')}",
+                 f"received: {self.total('http_wire_bytes_total') / 1e3:.0f} kB on the wire, "
+                 f"{self.total('http_body_bytes_total') / 1e3:.0f} kB of HTML"]
+        for name in ("http_cache_total", "parse_cache_total"):
+            rate = self.hit_rate(name)
+            if rate is not None:
+                lines.append(f"{name[:-6].replace('_', ' ')} hit rate: {rate:.0%}")
+        with self._lock:
+            latencies = sorted(self.histograms.get("http_request_seconds", {}).items())
+            parses = sorted(self.histograms.get("parse_seconds", {}).items())
+            stages = sorted(self.histograms.get("stage_seconds", {}).items())
+        for key, histogram in latencies + parses:
+            labels = ", ".join(value for _, value in key)
+            lines.append(f"{labels}: n={histogram.count} mean={histogram.sum / histogram.count * 1000:.1f} ms "
+                         f"p95={histogram.quantile(0.95) * 1000:.1f} ms max={histogram.max * 1000:.1f} ms")
+        for key, histogram in stages:
+            lines.append(f"stage {dict(key)['stage']}: {histogram.sum:.2f} s")
+        for outcome in ("kept", "filtered", "ragged"):
+            lines.append(f"rows {outcome}: {self.total('rows_total', outcome=outcome)}")
+        return "\n".join(lines)
+
+
+def _labels(key):
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Return the process-wide RunMetrics, which the client and the extractors record into by default
+    """
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = RunMetrics()
+        return _default_metrics
@@ -0,0 +1,301 @@
+"""
+SQLite store of the programs and visits, queryable in milliseconds instead of re-reading whole CSVs
+
+Drop-in alternative to status_store.ObservationStore: pass it as `store=` to harvest,
+fetch_observation_statuses or the extract_basic_info_* functions and every program and visit
+row (before any instrument/template filter) ends up in one SQLite file.
+
+e.g. store = SqliteObservationStore('observations.sqlite')
+     df = await harvest(store=store)
+     visits, headers = store.query_visits(template="NIRSpec MultiObject Spectroscopy", status="Scheduled")
+     programs, headers = store.query_programs("GO", cycle="Cycle 2")
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from status_store import INSTRUMENT_COLUMNS, normalize_proposal_id
+
+
+# Programs are keyed by (source, proposal, occurrence on the page), visits by (proposal, observation, visit).
+# The primary key of programs also serves as the index on source (prefix queries are range scans on it).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS program_pages (
+    source TEXT PRIMARY KEY,
+    headers TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS programs (
+    source TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    cycle TEXT,
+    instrument TEXT,
+    fields TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, proposal_id, seq)
+);
+CREATE INDEX IF NOT EXISTS programs_cycle ON programs (cycle);
+CREATE INDEX IF NOT EXISTS programs_proposal ON programs (proposal_id);
+CREATE TABLE IF NOT EXISTS visit_headers (
+    proposal_id TEXT PRIMARY KEY,
+    headers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS visits (
+    proposal_id TEXT NOT NULL,
+    observation TEXT NOT NULL,
+    visit TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT,
+    template TEXT,
+    fields TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (proposal_id, observation, visit)
+);
+CREATE INDEX IF NOT EXISTS visits_status ON visits (status);
+CREATE INDEX IF NOT EXISTS visits_template ON visits (template);
+"""
+
+# Rows whose fields did not change are left alone, so updated_at is when a row last changed
+_UPSERT_PROGRAM = """
+INSERT INTO programs (source, proposal_id, seq, position, cycle, instrument, fields, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, proposal_id, seq) DO UPDATE SET
+    position = excluded.position, cycle = excluded.cycle, instrument = excluded.instrument,
+    fields = excluded.fields, updated_at = excluded.updated_at
+WHERE programs.fields IS NOT excluded.fields OR programs.position IS NOT excluded.position
+"""
+
+_UPSERT_VISIT = """
+INSERT INTO visits (proposal_id, observation, visit, position, status, template, fields, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (proposal_id, observation, visit) DO UPDATE SET
+    position = excluded.position, status = excluded.status, template = excluded.template,
+    fields = excluded.fields, updated_at = excluded.updated_at
+WHERE visits.fields IS NOT excluded.fields OR visits.position IS NOT excluded.position
+"""
+
+_UPSERT_PAGE = """
+INSERT INTO program_pages (source, headers, updated_at) VALUES (?, ?, ?)
+ON CONFLICT (source) DO UPDATE SET headers = excluded.headers, updated_at = excluded.updated_at
+WHERE program_pages.headers IS NOT excluded.headers
+"""
+
+_UPSERT_VISIT_HEADERS = """
+INSERT INTO visit_headers (proposal_id, headers) VALUES (?, ?)
+ON CONFLICT (proposal_id) DO UPDATE SET headers = excluded.headers
+WHERE visit_headers.headers IS NOT excluded.headers
+"""
+
+_CYCLE_NUMBER = re.compile(r"\d+")
+
+
+def _cycle_name(text):
+    # "Cycle 2", "2" and 2 -> "Cycle 2", None if there is no number
+    match = _CYCLE_NUMBER.search(str(text or ""))
+    return f"Cycle {int(match.group())}" if match else None
+
+
+def _program_cycle(source, headers, row):
+    # Cycle from the page name (GO Cycle N) or from the page's Cycle column (DDT), None for GTO
+    if source.startswith("GO "):
+        return _cycle_name(source[3:])
+    if "Cycle" in headers and headers.index("Cycle") < len(row):
+        return _cycle_name(row[headers.index("Cycle")])
+    return None
+
+
+class SqliteObservationStore:
+    """
+    SQLite store of EVERY parsed program and visit row, with indexes on status, template, cycle and source
+    ** Refreshes upsert: unchanged rows are not rewritten, visits are written in batched transactions **
+
+    Same interface as ObservationStore (put_programs, put_visits, query_programs, query_visits, save),
+    safe to share between the worker threads of fetch_observation_statuses.
+
+    Args:
+        path (str): SQLite file, created if missing (":memory:" for a throwaway store)
+        batch_size (int): Visit rows buffered before they are written in one transaction,
+            save() and the queries write whatever is buffered
+    """
+
+    def __init__(self, path="observations.sqlite", batch_size=2000):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending = {}  # proposal ID -> (status_data, headers) not written yet
+        self._pending_rows = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def put_programs(self, source, data, headers):
+        """
+        Store all basic-info rows of one listing page, replacing the rows it had before
+
+        Args:
+            source (str): Name of the page, e.g. "GO Cycle 1", "GTO" or "DDT"
+            data (list): Rows as returned by the extract_basic_info_* functions
+            headers (list): Headers of those rows
+        """
+        now = time.time()
+        column = next((headers.index(c) for c in INSTRUMENT_COLUMNS if c in headers), None)
+        seen = {}
+        records = []
+        for position, row in enumerate(data):
+            proposal_id = normalize_proposal_id(row[0]) if row else ""
+            seq = seen[proposal_id] = seen.get(proposal_id, -1) + 1  # A program may be listed twice on a page
+            instrument = "".join(row[column].split()) if column is not None and column < len(row) else None
+            records.append((source, proposal_id, seq, position, _program_cycle(source, headers, row), instrument,
+                            json.dumps(row), now))
+
+        with self._lock, self._connection:
+            self._connection.execute(_UPSERT_PAGE, (source, json.dumps(headers), now))
+            self._connection.executemany(_UPSERT_PROGRAM, records)
+            stale = [(source, proposal_id, seq)
+                     for proposal_id, seq in self._connection.execute(
+                         "SELECT proposal_id, seq FROM programs WHERE source = ?", (source,))
+                     if seq > seen.get(proposal_id, -1)]
+            self._connection.executemany(
+                "DELETE FROM programs WHERE source = ? AND proposal_id = ? AND seq = ?", stale)
+
+    def put_visits(self, proposal_id, status_data, headers):
+        """Store all visit rows of one proposal, as returned by get_observation_status with a store"""
+        if not headers:
+            return  # Failed fetch, keep whatever was stored before
+        with self._lock:
+            key = normalize_proposal_id(proposal_id)
+            previous = self._pending.get(key)
+            self._pending_rows += len(status_data) - (len(previous[0]) if previous else 0)
+            self._pending[key] = (status_data, headers)
+            if self._pending_rows >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered visit rows in one transaction
+        ** Returns the number of visit rows inserted, changed or removed **
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending, self._pending_rows = self._pending, {}, 0
+            changes = self._connection.total_changes
+            now = time.time()
+            with self._connection:
+                for proposal_id, (status_data, headers) in pending.items():
+                    self._connection.execute(_UPSERT_VISIT_HEADERS, (proposal_id, json.dumps(headers)))
+                    keys = set()
+                    records = []
+                    for position, row in enumerate(status_data):
+                        key = (row.get("Observation", ""), row.get("Visit", ""))
+                        keys.add(key)
+                        records.append((proposal_id, *key, position, row.get("Status"), row.get("Template"),
+                                        json.dumps(row), now))
+                    self._connection.executemany(_UPSERT_VISIT, records)
+                    gone = [(proposal_id, *key) for key in self._connection.execute(
+                                "SELECT observation, visit FROM visits WHERE proposal_id = ?", (proposal_id,))
+                            if key not in keys]
+                    self._connection.executemany(
+                        "DELETE FROM visits WHERE proposal_id = ? AND observation = ? AND visit = ?", gone)
+            return self._connection.total_changes - changes
+
+    def query_programs(self, source, instrument=None, cycle=None):
+        """
+        Basic-info rows of the listing pages whose name starts with `source`
+
+        Args:
+            source (str): Page name or prefix, e.g. "GO" for all GO cycles, "" for every page
+            instrument (str): Keep rows whose instrument column contains this text
+                (spaces are ignored, so "NIRSpec/MOS" also matches "NIRSpec/ MOS"). None keeps all rows
+            cycle (str or int): Keep rows of this cycle, e.g. "Cycle 2" or 2 (GO and DDT pages only)
+        Returns:
+            data (list): Matching rows
+            headers (list): Headers of the first matching page
+        """
+        sql = "SELECT fields FROM programs WHERE source >= ? AND source < ?"
+        params = [source, source + "\U0010ffff"]
+        if instrument is not None:
+            sql += " AND instr(instrument, ?) > 0"
+            params.append(instrument.replace(' ', ''))
+        if cycle is not None:
+            sql += " AND cycle = ?"
+            params.append(_cycle_name(cycle))
+        sql += " ORDER BY source, position"
+        with self._lock:
+            data = [json.loads(fields) for fields, in self._connection.execute(sql, params)]
+            page = self._connection.execute(
+                "SELECT headers FROM program_pages WHERE source >= ? AND source < ? ORDER BY source LIMIT 1",
+                params[:2]).fetchone()
+        return data, json.loads(page[0]) if page else None
+
+    def query_visits(self, template=None, status=None, proposal_ids=None):
+        """
+        Visit rows matching a template and/or status
+
+        Args:
+            template (str): Keep visits whose Template contains this text, None keeps all
+            status (str): Keep visits whose Status is exactly this, None keeps all
+            proposal_ids (iterable): Only look at these proposals, None means every stored proposal
+        Returns:
+            status_data (list): Matching row dicts, each with an added "ID" key
+            headers (list): Ordered union of the headers of the matching proposals
+        """
+        conditions = []
+        params = []
+        with self._lock:
+            self.flush()
+            if template is not None:
+                # The few distinct templates come from the index, the rows are then looked up by value
+                templates = [name for name, in self._connection.execute(
+                    "SELECT DISTINCT template FROM visits WHERE template IS NOT NULL") if template in name]
+                conditions.append(f"template IN ({', '.join('?' * len(templates))})")
+                params.extend(templates)
+            if status is not None:
+                conditions.append("status = ?")
+                params.append(status)
+            if proposal_ids is not None:
+                ids = list(dict.fromkeys(normalize_proposal_id(proposal_id) for proposal_id in proposal_ids))
+                conditions.append(f"proposal_id IN ({', '.join('?' * len(ids))})")
+                params.extend(ids)
+            sql = "SELECT proposal_id, fields FROM visits"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            rows = self._connection.execute(sql + " ORDER BY proposal_id, position", params).fetchall()
+            matched = list(dict.fromkeys(proposal_id for proposal_id, _ in rows))
+            stored_headers = dict(self._connection.execute(
+                f"SELECT proposal_id, headers FROM visit_headers WHERE proposal_id IN ({', '.join('?' * len(matched))})",
+                matched))
+
+        headers = []
+        for proposal_id in matched:
+            headers.extend([header for header in json.loads(stored_headers[proposal_id]) if header not in headers])
+        return [{"ID": proposal_id, **json.loads(fields)} for proposal_id, fields in rows], headers
+
+    def get_visit(self, proposal_id, observation, visit):
+        """One visit row dict by its key, None if it is not stored"""
+        with self._lock:
+            self.flush()
+            row = self._connection.execute(
+                "SELECT fields FROM visits WHERE proposal_id = ? AND observation = ? AND visit = ?",
+                (normalize_proposal_id(proposal_id), str(observation), str(visit))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self):
+        """Write the buffered visits, everything else is already on disk"""
+        self.flush()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,417 @@
+"""
+History of the visit status: snapshot diffs, a change feed and run-length status intervals
+
+Every harvest is a snapshot of all visit rows, sorted by visit key (proposal, observation, visit).
+It is diffed against the previous one by a sort-merge on that key and only the visits that were
+added, removed or changed go to the change feed, so reading what moved from "Implementation" to
+"Scheduled" to "Archived" never means comparing files. The status of every visit is kept as
+(state, first_seen, last_seen) intervals, so polling often does not make the history grow.
+
+e.g. history = StatusHistory('status_history')
+     statuses = await fetch_observation_statuses(df['ID'])
+     history.append_snapshot(statuses)
+     changes, cursor = history.read_changes(cursor)     # only what changed since the last read
+     history.intervals.of(('1433', '21', '1'))          # [('Scheduled', t0, t1), ('Archived', t2, None)]
+"""
+from collections import deque, namedtuple
+import json
+import os
+import statistics
+import threading
+import time
+
+from status_store import normalize_proposal_id
+
+
+# One entry of the change feed. kind is "added", "removed" or "changed"; before and after hold the
+# changed fields only (None for an added / removed visit's missing side)
+Change = namedtuple("Change", ["taken_at", "key", "kind", "before", "after"])
+
+# One run of identical states of a visit, last_seen is None while it is still the current state
+Interval = namedtuple("Interval", ["state", "first_seen", "last_seen"])
+
+
+def visit_key(proposal_id, row):
+    """Key of a visit row: (proposal ID, observation, visit)"""
+    return normalize_proposal_id(proposal_id), row.get("Observation", ""), row.get("Visit", "")
+
+
+def snapshot_rows(statuses):
+    """
+    Sorted (key, fields) list of every visit of {proposal_id: (status_data, headers)}
+
+    Args:
+        statuses (dict): As returned by fetch_observation_statuses
+    Returns:
+        rows (list): (visit_key, row dict) tuples sorted by key
+    """
+    rows = [(visit_key(proposal_id, row), row)
+            for proposal_id, (status_data, _) in statuses.items() for row in status_data]
+    rows.sort(key=lambda item: item[0])
+    return rows
+
+
+def diff_snapshots(old_rows, new_rows, taken_at=None):
+    """
+    Sort-merge two snapshots and yield a Change for every visit that differs
+    ** One pass over both, each side must be sorted by key (see snapshot_rows) **
+
+    Args:
+        old_rows (iterable): (key, fields) of the older snapshot, sorted by key
+        new_rows (iterable): (key, fields) of the newer snapshot, sorted by key
+        taken_at (float): Time of the newer snapshot, stored in the changes
+    Yields:
+        change (Change): Added, removed or changed visit, in key order
+    """
+    old_rows, new_rows = iter(old_rows), iter(new_rows)
+    old, new = next(old_rows, None), next(new_rows, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield Change(taken_at, old[0], "removed", old[1], None)
+            old = next(old_rows, None)
+        elif old is None or new[0] < old[0]:
+            yield Change(taken_at, new[0], "added", None, new[1])
+            new = next(new_rows, None)
+        else:
+            if old[1] != new[1]:
+                fields = [field for field in dict.fromkeys([*old[1], *new[1]]) if old[1].get(field) != new[1].get(field)]
+                yield Change(taken_at, new[0], "changed",
+                             {field: old[1].get(field) for field in fields},
+                             {field: new[1].get(field) for field in fields})
+            old, new = next(old_rows, None), next(new_rows, None)
+
+
+class StatusIntervals:
+    """
+    Run-length history of one field (Status by default) of every visit: (state, first_seen, last_seen) intervals
+    ** A poll where nothing changed costs one short line, compact() folds the log into one record per visit **
+
+    The file is a log of JSON lines:
+        {"key": [...], "intervals": [[state, first_seen, last_seen], ...]}  compacted history of a visit
+        {"key": [...], "state": ..., "at": t}                                visit seen in a new state at poll t
+        {"key": [...], "gone": t}                                            visit missing from poll t
+        {"poll": t}                                                          poll t is complete
+    The current interval of a visit has last_seen null and lasts until the latest complete poll.
+
+    An unchanged visit only extends its interval, so a visit gets a second interval in the same
+    state only after it went missing from some polls. Compaction merges those again when the
+    visit was only missing from about one poll (see compact).
+
+    Args:
+        path (str): JSONL file of the intervals, created if missing
+        field (str): Row field whose value is the state
+        compact_every (int): Compact after this many polls, None to only compact when asked
+    """
+
+    def __init__(self, path, field="Status", compact_every=100):
+        self.path = path
+        self.field = field
+        self.compact_every = compact_every
+        self.visits = {}  # key -> [[state, first_seen, last_seen or None], ...]
+        self.last_poll = None
+        self._poll_gaps = deque(maxlen=100)  # Seconds between the recent polls
+        self._polls_since_compaction = 0
+        _drop_partial_line(path)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if "poll" in record:
+                    if "period" in record:
+                        self._poll_gaps.append(record["period"])  # Kept by compact()
+                    elif self.last_poll is not None:
+                        self._poll_gaps.append(record["poll"] - self.last_poll)
+                    self.last_poll = record["poll"]
+                    self._polls_since_compaction += 1
+                elif "intervals" in record:
+                    self.visits[tuple(record["key"])] = record["intervals"]
+                elif "gone" in record:
+                    self._close(tuple(record["key"]))
+                else:
+                    self._open(tuple(record["key"]), record["state"], record["at"])
+        # A poll cut short by a crash: its events are kept, the next poll completes them
+
+    def _close(self, key):
+        # End the current interval of a visit at the previous complete poll
+        intervals = self.visits.get(key)
+        if intervals and intervals[-1][2] is None:
+            intervals[-1][2] = self.last_poll
+
+    def _open(self, key, state, at):
+        self._close(key)
+        self.visits.setdefault(key, []).append([state, at, None])
+
+    def observe(self, rows, taken_at):
+        """
+        Record one poll: extend the intervals of unchanged visits, open new ones for the rest
+
+        Args:
+            rows (iterable): (key, fields) of every visit of the poll, e.g. from snapshot_rows
+            taken_at (float): Time of the poll, later than the previous one
+        """
+        events = []
+        seen = set()
+        for key, fields in rows:
+            seen.add(key)
+            state = fields.get(self.field)
+            intervals = self.visits.get(key)
+            if intervals and intervals[-1][2] is None and intervals[-1][0] == state:
+                continue  # Same state as at the last poll, the open interval now reaches taken_at
+            events.append({"key": list(key), "state": state, "at": taken_at})
+        for key, intervals in self.visits.items():
+            if key not in seen and intervals[-1][2] is None:
+                events.append({"key": list(key), "gone": taken_at})
+
+        _append_lines(self.path, events + [{"poll": taken_at}])
+        for event in events:
+            if "gone" in event:
+                self._close(tuple(event["key"]))
+            else:
+                self._open(tuple(event["key"]), event["state"], taken_at)
+        if self.last_poll is not None:
+            self._poll_gaps.append(taken_at - self.last_poll)
+        self.last_poll = taken_at
+        self._polls_since_compaction += 1
+        if self.compact_every is not None and self._polls_since_compaction >= self.compact_every:
+            self.compact()
+
+    @property
+    def poll_period(self):
+        """Typical number of seconds between two polls (median of the recent ones), None before the second poll"""
+        return statistics.median(self._poll_gaps) if self._poll_gaps else None
+
+    def compact(self, max_gap=None):
+        """
+        Rewrite the file as one record per visit (atomically), dropping the event and poll lines
+        ** Consecutive intervals of a visit with the same state are merged when at most max_gap seconds apart **
+
+        Two intervals of a visit that are consecutive polls apart are two poll periods apart,
+        so the default (2.5 poll periods) forgets a visit that was missing from a single poll,
+        and keeps longer absences.
+
+        Args:
+            max_gap (float): Largest gap bridged between two intervals of the same state, None for
+                2.5 x poll_period, float("inf") to merge every run of a state with no other state in between
+        """
+        if max_gap is None:
+            max_gap = 2.5 * self.poll_period if self.poll_period is not None else 0.0
+        for key, intervals in self.visits.items():
+            merged = [intervals[0]]
+            for interval in intervals[1:]:
+                previous = merged[-1]
+                if interval[0] == previous[0] and previous[2] is not None and interval[1] - previous[2] <= max_gap:
+                    previous[2] = interval[2]
+                else:
+                    merged.append(interval)
+            self.visits[key] = merged
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, intervals in self.visits.items():
+                f.write(json.dumps({"key": list(key), "intervals": intervals}) + "\n")
+            if self.last_poll is not None:
+                poll = {"poll": self.last_poll}
+                if self.poll_period is not None:
+                    poll["period"] = self.poll_period
+                f.write(json.dumps(poll) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._polls_since_compaction = 0
+
+    def of(self, key):
+        """Intervals of one visit, oldest first, the current one with last_seen None"""
+        return [Interval(*interval) for interval in self.visits.get(tuple(key), [])]
+
+    def state_at(self, key, when):
+        """State of a visit at a time, None if it was not seen around then"""
+        for state, first_seen, last_seen in self.visits.get(tuple(key), []):
+            if first_seen <= when <= (self.last_poll if last_seen is None else last_seen):
+                return state
+        return None
+
+    def in_state(self, state, when=None):
+        """
+        Keys of the visits in a state at a time (at the latest poll by default)
+        """
+        when = self.last_poll if when is None else when
+        return [key for key in self.visits if when is not None and self.state_at(key, when) == state]
+
+
+class StatusHistory:
+    """
+    Store of the visit status over time: latest snapshot, change feed and status intervals
+    ** The change feed is only ever appended to, a change is written once and read once per consumer **
+
+    Files in `directory`:
+        latest.json      the last snapshot, replaced every time, the next one is diffed against it
+        changes.jsonl    one line per change, in snapshot then key order
+        intervals.jsonl  run-length status history of every visit, see StatusIntervals
+        snapshots.jsonl  only with keep_snapshots: one line per snapshot,
+                         {"taken_at", "columns", "rows": [[proposal, observation, visit, values...]]}
+
+    A proposal whose fetch failed (no headers) is carried over from the previous snapshot,
+    so a network error does not show up as all its visits being removed.
+
+    Args:
+        directory (str): Directory of the history, created if missing
+        keep_snapshots (bool): Also keep every full snapshot, the file then grows with every poll
+        compact_every (int): Compact the intervals every this many snapshots, None to never do it automatically
+    """
+
+    def __init__(self, directory="status_history", keep_snapshots=False, compact_every=100):
+        self.directory = directory
+        self.keep_snapshots = keep_snapshots
+        self.latest_path = os.path.join(directory, "latest.json")
+        self.snapshots_path = os.path.join(directory, "snapshots.jsonl")
+        self.changes_path = os.path.join(directory, "changes.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        for path in (self.snapshots_path, self.changes_path):
+            _drop_partial_line(path)
+        self.intervals = StatusIntervals(os.path.join(directory, "intervals.jsonl"), compact_every=compact_every)
+        self._last = None  # (taken_at, rows) of the last snapshot, loaded on first use
+
+    def last_snapshot(self):
+        """(taken_at, rows) of the latest snapshot, (None, []) if there is none"""
+        if self._last is None:
+            if os.path.exists(self.latest_path):
+                with open(self.latest_path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            else:
+                line = _last_line(self.snapshots_path)
+                record = json.loads(line) if line.strip() else None
+            self._last = (record["taken_at"], _decode_rows(record)) if record else (None, [])
+        return self._last
+
+    def snapshots(self):
+        """Iterate over every (taken_at, rows) snapshot kept with keep_snapshots, oldest first"""
+        if not os.path.exists(self.snapshots_path):
+            return
+        with open(self.snapshots_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                yield record["taken_at"], _decode_rows(record)
+
+    def append_snapshot(self, statuses, taken_at=None):
+        """
+        Record a snapshot of the visit rows: changes since the previous one, status intervals, latest snapshot
+
+        Args:
+            statuses (dict): {proposal_id: (status_data, headers)} as returned by fetch_observation_statuses
+            taken_at (float): Time of the snapshot, time.time() by default
+        Returns:
+            changes (list): Change of every added, removed or changed visit
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        with self._lock:
+            _, previous = self.last_snapshot()
+            rows = snapshot_rows(statuses)
+            failed = {normalize_proposal_id(proposal_id) for proposal_id, (_, headers) in statuses.items()
+                      if not headers}
+            if failed:
+                rows.extend(item for item in previous if item[0][0] in failed)
+                rows.sort(key=lambda item: item[0])
+
+            changes = list(diff_snapshots(previous, rows, taken_at))
+            # Changes first: after a crash in between, the next snapshot repeats them rather than losing them
+            if changes:
+                _append_lines(self.changes_path, [_encode_change(change) for change in changes])
+            self.intervals.observe(rows, taken_at)
+            record = _encode_rows(taken_at, rows)
+            if self.keep_snapshots:
+                _append_line(self.snapshots_path, record)
+            tmp_path = self.latest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self.latest_path)
+            self._last = (taken_at, rows)
+        return changes
+
+    def read_changes(self, cursor=0):
+        """
+        Changes appended after `cursor`, and the cursor to pass next time
+        ** Seeks straight to the cursor: the cost is the number of new changes, not the history size **
+
+        Args:
+            cursor (int): Byte offset returned by the previous call, 0 for the whole feed
+        Returns:
+            changes (list): Change records, oldest first
+            cursor (int): Offset just past the last complete change read
+        """
+        changes = []
+        if not os.path.exists(self.changes_path):
+            return changes, cursor
+        with open(self.changes_path, "rb") as f:
+            f.seek(cursor)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Being written, read it next time
+                record = json.loads(line)
+                changes.append(Change(record["taken_at"], tuple(record["key"]), record["kind"],
+                                      record["before"], record["after"]))
+                cursor += len(line)
+        return changes, cursor
+
+
+def _encode_rows(taken_at, rows):
+    # Columns once per snapshot, then one list per visit: key then values (None for a missing column)
+    columns = list(dict.fromkeys(field for _, fields in rows for field in fields))
+    return {"taken_at": taken_at, "columns": columns,
+            "rows": [[*key, *(fields.get(column) for column in columns)] for key, fields in rows]}
+
+
+def _decode_rows(record):
+    columns = record["columns"]
+    return [(tuple(values[:3]), {column: value for column, value in zip(columns, values[3:]) if value is not None})
+            for values in record["rows"]]
+
+
+def _encode_change(change):
+    return {"taken_at": change.taken_at, "key": list(change.key), "kind": change.kind,
+            "before": change.before, "after": change.after}
+
+
+def _drop_partial_line(path):
+    # Cut a last line left unfinished by a crash, so the next record starts on a line of its own
+    if not os.path.exists(path):
+        return
+    tail = _last_line(path, complete=False)
+    if tail and not tail.endswith(b"\n"):
+        with open(path, "rb+") as f:
+            f.truncate(f.seek(0, os.SEEK_END) - len(tail))
+
+
+def _last_line(path, complete=True, block_size=1 << 16):
+    # Last line of a file (bytes), read backwards from the end. With complete, a trailing partial line is skipped
+    if not os.path.exists(path):
+        return b""
+    with open(path, "rb") as f:
+        position = end = f.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            tail = f.read(position - start) + tail
+            position = start
+            if tail.count(b"\n", 0, len(tail) - 1) >= (2 if complete and not tail.endswith(b"\n") else 1):
+                break
+    lines = tail.splitlines(keepends=True)
+    if complete and lines and not lines[-1].endswith(b"\n"):
+        lines.pop()
+    return lines[-1] if lines else b""
+
+
+def _append_line(path, record):
+    _append_lines(path, [record])
+
+
+def _append_lines(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,409 @@
+from collections import namedtuple
+from concurrent.futures import Future
+from datetime import date, datetime, timezone
+from functools import lru_cache
+import json
+import os
+import re
+import threading
+import time
+
+
+# Visit states that never change again once reached
+TERMINAL_STATUSES = {"Archived", "FailedArchived", "Withdrawn"}
+
+# Visit states that are still being worked on and change often
+ACTIVE_STATUSES = {"Implementation", "Flight Ready", "Scheduled"}
+
+# One plan window of a visit, first and last day included (datetime.date)
+PlanWindow = namedtuple("PlanWindow", ["start", "end"])
+
+# Day-of-year bounds of a plan window, e.g. "(2025.106 - 2025.110)" -> 2025, 106, 2025, 110
+_WINDOW_PATTERN = re.compile(r"\((\d{4})\.(\d{3})\s*-\s*(\d{4})\.(\d{3})\)")
+
+# Calendar bounds, only read when a window has no day-of-year part, e.g. "Apr 16, 2025 - Apr 20, 2025"
+_CALENDAR_WINDOW_PATTERN = re.compile(r"([A-Z][a-z]{2} \d{1,2}, \d{4})\s*-\s*([A-Z][a-z]{2} \d{1,2}, \d{4})")
+
+
+@lru_cache(maxsize=None)
+def _year_ordinal(year):
+    # Proleptic ordinal of the day before Jan 1 of a year, so day `doy` is _year_ordinal(year) + doy
+    return date(int(year), 1, 1).toordinal() - 1
+
+
+def parse_plan_windows(plan_windows):
+    """
+    Split a "Plan Windows" text into its windows
+    ** Reads the day-of-year part "(2025.106 - 2025.110)" with plain integer arithmetic, no date parsing **
+
+    Windows are concatenated with no separator on the page, e.g.
+    "Apr 16, 2025 - Apr 20, 2025 (2025.106 - 2025.110)Apr 21, 2025 - May 2, 2025 (2025.111 - 2025.122)".
+    Texts without any window (e.g. "Ready for long range planning, plan window not yet assigned") give [].
+
+    Args:
+        plan_windows (str): "Plan Windows" cell of a get-visit-status row
+    Returns:
+        windows (list): PlanWindow(start, end) in page order
+    """
+    if not plan_windows:
+        return []
+    windows = [PlanWindow(date.fromordinal(_year_ordinal(start_year) + int(start_doy)),
+                          date.fromordinal(_year_ordinal(end_year) + int(end_doy)))
+               for start_year, start_doy, end_year, end_doy in _WINDOW_PATTERN.findall(plan_windows)]
+    if windows:
+        return windows
+    return [PlanWindow(datetime.strptime(start, "%b %d, %Y").date(), datetime.strptime(end, "%b %d, %Y").date())
+            for start, end in _CALENDAR_WINDOW_PATTERN.findall(plan_windows)]
+
+
+def _last_window_end(plan_windows):
+    """
+    Return the latest end date (as a UTC timestamp) in a "Plan Windows" text, or None
+    """
+    ends = [window.end for window in parse_plan_windows(plan_windows)]
+    return datetime.combine(max(ends), datetime.min.time(), timezone.utc).timestamp() if ends else None
+
+
+class StatusFreshnessPolicy:
+    """
+    Decide how long the parsed visit rows of a program stay fresh, based on their status
+    ** Programs whose visits are all terminal (e.g. Archived) are re-checked rarely or never **
+
+    Args:
+        terminal_ttl (float): Seconds a program with only terminal visits stays fresh, None means forever
+        active_ttl (float): Seconds a program with an active visit or a future plan window stays fresh
+        default_ttl (float): Seconds any other program stays fresh
+    """
+
+    def __init__(self, terminal_ttl=30 * 86400, active_ttl=6 * 3600, default_ttl=86400):
+        self.terminal_ttl = terminal_ttl
+        self.active_ttl = active_ttl
+        self.default_ttl = default_ttl
+
+    def ttl(self, status_data, now=None):
+        """
+        Time-to-live (seconds) of a program's visit rows, None if they never go stale
+
+        Args:
+            status_data (list): List of row dicts as returned by get_observation_status
+            now (float): Current UTC timestamp, defaults to time.time()
+        """
+        now = time.time() if now is None else now
+        if not status_data:
+            return self.default_ttl
+
+        statuses = [row.get("Status", "") for row in status_data]
+        if any(status in ACTIVE_STATUSES for status in statuses):
+            return self.active_ttl
+        for row in status_data:
+            window_end = _last_window_end(row.get("Plan Windows"))
+            if window_end is not None and window_end >= now:
+                return self.active_ttl
+        if all(status in TERMINAL_STATUSES for status in statuses):
+            return self.terminal_ttl
+        return self.default_ttl
+
+
+class StatusCache:
+    """
+    Local JSON cache of parsed visit rows, keyed by proposal ID
+    ** Used by refresh_observation_statuses to fetch only the programs that can still change **
+
+    Args:
+        path (str): JSON file holding the cache, loaded if it exists
+        policy (StatusFreshnessPolicy): Freshness policy, the default one if None
+    """
+
+    def __init__(self, path="status_cache.json", policy=None):
+        self.path = path
+        self.policy = policy or StatusFreshnessPolicy()
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, proposal_id):
+        """Return (status_data, headers) cached for a proposal, or None"""
+        entry = self.entries.get(str(proposal_id))
+        if entry is None:
+            return None
+        return entry["status_data"], entry["headers"]
+
+    def put(self, proposal_id, status_data, headers, fetched_at=None):
+        """
+        Store the visit rows of a proposal
+
+        Results with no headers (failed fetch or page without tables) are not stored,
+        so those proposals are fetched again on the next refresh.
+        """
+        if not headers:
+            return
+        with self._lock:
+            self.entries[str(proposal_id)] = {
+                "fetched_at": time.time() if fetched_at is None else fetched_at,
+                "status_data": status_data,
+                "headers": headers,
+            }
+
+    def is_fresh(self, proposal_id, now=None):
+        """True if the cached rows of a proposal do not need to be fetched again yet"""
+        entry = self.entries.get(str(proposal_id))
+        if entry is None:
+            return False
+        now = time.time() if now is None else now
+        ttl = self.policy.ttl(entry["status_data"], now)
+        return ttl is None or now - entry["fetched_at"] < ttl
+
+    def stale_ids(self, proposal_ids, now=None):
+        """
+        Return the proposal IDs (in input order) that are missing or out of date
+        """
+        now = time.time() if now is None else now
+        return [proposal_id for proposal_id in proposal_ids if not self.is_fresh(proposal_id, now)]
+
+    def save(self):
+        """Write the cache to disk (atomically)"""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+
+class StatusJournal:
+    """
+    Append-only JSONL journal of finished proposals, so an interrupted harvest can resume
+    ** Each proposal's parsed result is written (and flushed) as soon as it is fetched **
+
+    Proposals are keyed by normalize_proposal_id, so 1433, "1433" and 1433.0 are one entry.
+
+    e.g. journal = StatusJournal('GO_status_journal.jsonl')
+         statuses = await fetch_observation_statuses(df['ID'], journal=journal)
+
+    Args:
+        path (str): JSONL file of the journal, appended to if it exists
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = self._load()
+
+    def _load(self):
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Line cut short by a crash, that proposal is fetched again
+                done[normalize_proposal_id(record["id"])] = (record["status_data"], record["headers"])
+            cut_short = f.tell() > 0 and not line.endswith("\n")
+        if cut_short:
+            # End the broken line so the next record starts on a line of its own
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        return done
+
+    def is_done(self, proposal_id):
+        return normalize_proposal_id(proposal_id) in self.done
+
+    def get(self, proposal_id):
+        """Return (status_data, headers) journaled for a proposal, or None"""
+        return self.done.get(normalize_proposal_id(proposal_id))
+
+    def pending_ids(self, proposal_ids):
+        """Return the proposal IDs (in input order) that are not in the journal yet"""
+        return [proposal_id for proposal_id in proposal_ids if not self.is_done(proposal_id)]
+
+    def append(self, proposal_id, status_data, headers):
+        """
+        Record a finished proposal. Results with no headers (failed fetch) are not recorded,
+        so those proposals are fetched again when the harvest is resumed.
+        """
+        if not headers:
+            return
+        key = normalize_proposal_id(proposal_id)
+        record = {"id": key, "fetched_at": time.time(),
+                  "status_data": status_data, "headers": headers}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done[key] = (status_data, headers)
+
+
+# Header names of the instrument column on the GO, GTO and DDT listing pages
+INSTRUMENT_COLUMNS = ("Instrument/ Mode", "Instrument/Mode", "Instruments")
+
+
+class ObservationStore:
+    """
+    Local JSON store of EVERY parsed program and visit row, before any instrument/template filter
+    ** One crawl with a store answers any number of instrument/mode questions offline **
+
+    e.g. store = ObservationStore('observations.json')
+         extract_basic_info_from_GTO(url, store=store)                      # NIRSpec/MOS rows, all rows stored
+         ifu_data, headers = store.query_programs("GTO", instrument="NIRSpec/IFU")
+         visits, headers = store.query_visits(template="NIRCam Imaging")
+
+    Args:
+        path (str): JSON file holding the store, loaded if it exists
+    """
+
+    def __init__(self, path="observations.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.programs = {}  # source -> {"headers": [...], "rows": [[...], ...]}
+        self.visits = {}  # proposal ID -> {"headers": [...], "rows": [{...}, ...]}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self.programs = stored.get("programs", {})
+            self.visits = stored.get("visits", {})
+
+    def put_programs(self, source, data, headers):
+        """
+        Store all basic-info rows of one listing page
+
+        Args:
+            source (str): Name of the page, e.g. "GO Cycle 1", "GTO" or "DDT"
+            data (list): Rows as returned by the extract_basic_info_* functions
+            headers (list): Headers of those rows
+        """
+        with self._lock:
+            self.programs[source] = {"headers": headers, "rows": data}
+
+    def put_visits(self, proposal_id, status_data, headers):
+        """Store all visit rows of one proposal, as returned by get_observation_status(..., store=...)"""
+        if not headers:
+            return  # Failed fetch, keep whatever was stored before
+        with self._lock:
+            self.visits[str(proposal_id)] = {"headers": headers, "rows": status_data}
+
+    def query_programs(self, source, instrument=None):
+        """
+        Basic-info rows of the listing pages whose name starts with `source`
+
+        Args:
+            source (str): Page name or prefix, e.g. "GO" for all GO cycles
+            instrument (str): Keep rows whose instrument column contains this text
+                (spaces are ignored, so "NIRSpec/MOS" also matches "NIRSpec/ MOS"). None keeps all rows
+        Returns:
+            data (list): Matching rows
+            headers (list): Headers of the first matching page
+        """
+        data = []
+        headers = None
+        wanted = instrument.replace(' ', '') if instrument is not None else None
+        for name, page in self.programs.items():
+            if not name.startswith(source):
+                continue
+            if headers is None:
+                headers = page["headers"]
+            column = next((page["headers"].index(c) for c in INSTRUMENT_COLUMNS if c in page["headers"]), None)
+            for row in page["rows"]:
+                if wanted is None or (column is not None and wanted in "".join(row[column].split())):
+                    data.append(row)
+        return data, headers
+
+    def query_visits(self, template=None, status=None, proposal_ids=None):
+        """
+        Visit rows matching a template and/or status
+
+        Args:
+            template (str): Keep visits whose Template contains this text, None keeps all
+            status (str): Keep visits whose Status is exactly this, None keeps all
+            proposal_ids (iterable): Only look at these proposals, None means every stored proposal
+        Returns:
+            status_data (list): Matching row dicts, each with an added "ID" key
+            headers (list): Ordered union of the headers of the matching proposals
+        """
+        keys = self.visits if proposal_ids is None else [str(proposal_id) for proposal_id in proposal_ids]
+        status_data = []
+        headers = []
+        for key in keys:
+            entry = self.visits.get(key)
+            if entry is None:
+                continue
+            rows = [row for row in entry["rows"]
+                    if (template is None or template in row.get("Template", ""))
+                    and (status is None or row.get("Status") == status)]
+            if rows:
+                headers.extend([header for header in entry["headers"] if header not in headers])
+                status_data.extend({"ID": key, **row} for row in rows)
+        return status_data, headers
+
+    def save(self):
+        """Write the store to disk (atomically)"""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"programs": self.programs, "visits": self.visits}, f)
+            os.replace(tmp_path, self.path)
+
+
+def normalize_proposal_id(proposal_id):
+    """
+    Canonical text form of a proposal ID, so 1433, "1433", " 1433" and 1433.0 are the same program
+    """
+    text = str(proposal_id).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+
+class StatusRegistry:
+    """
+    Per-run registry of status fetches, keyed by normalized proposal ID
+    ** A program asked for several times is fetched once: later callers share the in-flight future **
+
+    e.g. registry = StatusRegistry()
+         for proposal_id in df['ID']:          # duplicates cost nothing
+             get_observation_status(proposal_id, registry=registry)
+
+    Attributes:
+        requested (int): Number of lookups
+        fetched (int): Number of lookups that actually fetched
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.fetched = 0
+
+    def run(self, proposal_id, fetch):
+        """
+        Return the result of fetch() for a proposal, calling it only for the first request of that proposal
+
+        Args:
+            proposal_id (str or int): Proposal ID, normalized with normalize_proposal_id
+            fetch (callable): Fetches and parses the proposal, called without arguments
+        """
+        key = normalize_proposal_id(proposal_id)
+        with self._lock:
+            self.requested += 1
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.fetched += 1
+        if owner:
+            try:
+                future.set_result(fetch())
+            except BaseException as error:
+                future.set_exception(error)
+        return future.result()
+
+    def __contains__(self, proposal_id):
+        return normalize_proposal_id(proposal_id) in self._futures
+
+    def __len__(self):
+        return len(self._futures)
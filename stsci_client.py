@@ -0,0 +1,721 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, urlunsplit
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import hashlib
+import json
+import os
+import random
+import requests
+import threading
+import time
+
+from run_metrics import get_metrics
+from run_logging import get_logger
+
+
+logger = get_logger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "jwst_program_extractor (+https://github.com/CaiSijia01/jwst_program_extractor)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket rate limiter keyed by host, with AIMD rate control
+    ** The rate grows additively after fast 200s and is halved after timeouts, 429s or 5xx **
+
+    Thread-safe, so one limiter can be shared by every worker of fetch_observation_statuses.
+
+    Recovery: the rate only grows when a fast answer comes back, by `increase` each time, so
+    from min_rate it takes (max_rate - min_rate) / increase fast answers to get back to full
+    speed (18 with the defaults, about 10 seconds). min_rate is kept high enough that a burst
+    of errors never leaves the whole harvest waiting many seconds for each of those answers.
+    A 429 or 503 with a Retry-After header also pauses the host for that long (up to max_pause).
+
+    Args:
+        initial_rate (float): Starting request rate (requests per second) for a new host
+        min_rate (float): Lower bound of the rate
+        max_rate (float): Upper bound of the rate
+        increase (float): Amount added to the rate after each fast successful response
+        decrease (float): Factor the rate is multiplied by after a failure
+        burst (float): Bucket capacity, i.e. how many requests may go out back-to-back
+        fast_response (float): Responses quicker than this (seconds) count as fast
+        max_pause (float): Longest Retry-After (seconds) the host is paused for
+    """
+
+    def __init__(self, initial_rate=1.0, min_rate=0.5, max_rate=5.0, increase=0.25,
+                 decrease=0.5, burst=2.0, fast_response=2.0, max_pause=60.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.fast_response = fast_response
+        self.max_pause = max_pause
+        self._buckets = {}  # host -> [rate, tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        if host not in self._buckets:
+            self._buckets[host] = [self.initial_rate, 1.0, time.monotonic()]
+        return self._buckets[host]
+
+    def _refill(self, bucket):
+        now = time.monotonic()
+        bucket[1] = min(self.burst, bucket[1] + (now - bucket[2]) * bucket[0])
+        bucket[2] = now
+
+    def rate(self, host):
+        """Current request rate (requests per second) for a host"""
+        with self._lock:
+            return self._bucket(host)[0]
+
+    def acquire(self, host):
+        """
+        Block until a request to `host` is allowed, then consume one token
+        """
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                self._refill(bucket)
+                if bucket[1] >= 1:
+                    bucket[1] -= 1
+                    return
+                wait = (1 - bucket[1]) / bucket[0]
+            time.sleep(wait)
+
+    def record(self, host, status_code=None, elapsed=None, retry_after=None):
+        """
+        Feed the outcome of a request back into the rate of its host
+
+        Args:
+            host (str): Host the request went to
+            status_code (int): HTTP status code, None if the request failed (timeout, connection error)
+            elapsed (float): Response time in seconds
+            retry_after (str): Retry-After header of the response, if any (seconds, HTTP dates are ignored)
+        """
+        with self._lock:
+            bucket = self._bucket(host)
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self._refill(bucket)
+                bucket[0] = max(self.min_rate, bucket[0] * self.decrease)
+                bucket[1] = min(bucket[1], 0.0)  # Drop any saved-up burst
+                pause = _seconds(retry_after)
+                if pause:
+                    # Owe enough tokens that the next request waits `pause` seconds at the new rate
+                    bucket[1] = min(bucket[1], 1 - min(pause, self.max_pause) * bucket[0])
+            elif status_code in (200, 304) and elapsed is not None and elapsed < self.fast_response:
+                bucket[0] = min(self.max_rate, bucket[0] + self.increase)
+
+
+def _seconds(retry_after):
+    # Retry-After in seconds, None if missing or an HTTP date
+    try:
+        return max(0.0, float(retry_after)) if retry_after is not None else None
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    """
+    Which failures are retried, and how long to wait in between
+    ** Capped exponential backoff with full jitter, honouring Retry-After **
+
+    Connection errors, timeouts and the status codes in retry_statuses are retried. Other
+    errors (e.g. 404) are not, they are raised straight away.
+
+    Args:
+        retries (int): Number of retries after the first attempt
+        backoff (float): Base delay (seconds), the n-th retry waits up to backoff * 2**n
+        max_backoff (float): Upper bound of any single delay
+        connect_timeout (float): Seconds to wait for the connection to open
+        read_timeout (float): Seconds to wait for the server to answer
+        retry_statuses (tuple): HTTP status codes that are worth retrying
+    """
+
+    def __init__(self, retries=3, backoff=2.0, max_backoff=60.0, connect_timeout=10, read_timeout=60,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_statuses = set(retry_statuses)
+
+    @property
+    def timeout(self):
+        """(connect, read) timeout tuple for requests"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def is_retryable_error(self, error):
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number `attempt` (0 for the first retry)
+
+        Args:
+            attempt (int): Number of retries already made
+            retry_after (str): Retry-After header of the failed response, if any
+        """
+        seconds = _seconds(retry_after)
+        if seconds is not None:
+            return min(self.max_backoff, seconds)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker that pauses all requests while a host keeps failing
+    ** After failure_threshold failures in a row, requests wait out a cooldown, then one probe is let through **
+
+    A successful probe closes the circuit. A failed one opens it again with a doubled cooldown.
+    Failures are requests that raise (connection errors, timeouts, broken bodies...), 429 and 5xx answers.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit
+        cooldown (float): Seconds the circuit stays open the first time
+        max_cooldown (float): Upper bound of the cooldown
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {"failures": 0, "open_until": None, "cooldown": self.cooldown, "probing": False}
+        return self._hosts[host]
+
+    def is_open(self, host):
+        with self._condition:
+            return self._state(host)["open_until"] is not None
+
+    def wait(self, host):
+        """
+        Block while the circuit of `host` is open. Once the cooldown is over, the first caller
+        goes ahead as the probe and the others keep waiting for its outcome.
+        """
+        with self._condition:
+            while True:
+                state = self._state(host)
+                if state["open_until"] is None:
+                    return
+                remaining = state["open_until"] - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                elif not state["probing"]:
+                    state["probing"] = True
+                    return
+                else:
+                    self._condition.wait(1.0)
+
+    def record_success(self, host):
+        with self._condition:
+            state = self._state(host)
+            if state["open_until"] is not None:
+                logger.info("%s is answering again, resuming", host)
+            state.update(failures=0, open_until=None, cooldown=self.cooldown, probing=False)
+            self._condition.notify_all()
+
+    def record_failure(self, host):
+        with self._condition:
+            state = self._state(host)
+            state["failures"] += 1
+            if state["probing"] or (state["open_until"] is None and state["failures"] >= self.failure_threshold):
+                logger.warning("%s keeps failing, pausing requests for %.0fs", host, state["cooldown"])
+                state["open_until"] = time.monotonic() + state["cooldown"]
+                state["cooldown"] = min(self.max_cooldown, state["cooldown"] * 2)
+                state["probing"] = False
+            self._condition.notify_all()
+
+
+class LatencyTracker:
+    """
+    Recent response times per host, used to pick the hedging delay
+
+    Args:
+        window (int): Number of most recent latencies kept per host
+        min_samples (int): Percentiles are only reported once a host has this many samples
+    """
+
+    def __init__(self, window=500, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, seconds):
+        with self._lock:
+            self._samples.setdefault(host, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, host, q):
+        """
+        The q-th percentile (0-100) of the recent latencies of a host, None if there are too few samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+class HTTPCache:
+    """
+    Disk-backed cache of GET responses, revalidated with ETag / Last-Modified
+    ** A 304 answer reuses the stored body, and optionally a stored parse result of that body **
+
+    Every url is stored as <sha256>.body (raw bytes) and <sha256>.json (validators, headers
+    and parse results). Only responses carrying an ETag or Last-Modified header are stored,
+    since nothing else can be revalidated.
+
+    Args:
+        directory (str): Folder holding the cache files, created if missing
+    """
+
+    def __init__(self, directory=".stsci_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".body"), os.path.join(self.directory, key + ".json")
+
+    def _write(self, path, data):
+        # Write to a temporary file first so a crash never leaves a half-written entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_meta(self, url):
+        meta_path = self._paths(url)[1]
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url):
+        """
+        Headers that turn a GET of `url` into a conditional request, empty if nothing is cached
+        """
+        meta = self._load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load_body(self, url):
+        """Return (body bytes, stored headers) of a cached url, or (None, None)"""
+        meta = self._load_meta(url)
+        if meta is None:
+            return None, None
+        try:
+            with open(self._paths(url)[0], "rb") as f:
+                return f.read(), meta.get("headers", {})
+        except OSError:
+            return None, None
+
+    def store(self, url, response):
+        """
+        Store a 200 response to `url` if it carries validators, dropping any parse results of the old body
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        body_path, meta_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {k: v for k, v in response.headers.items()
+                        if k.lower() in ("content-type", "etag", "last-modified", "date")},
+            "stored_at": time.time(),
+            "parsed": {},
+        }
+        with self._lock:
+            self._write(body_path, response.content)
+            self._write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def load_parsed(self, url, key):
+        """
+        Return the parse result stored under `key` for the cached body of `url`, or None
+
+        Args:
+            url (str): URL of the cached page
+            key (str): Name of the parse, e.g. "GO:Cycle 1" or "observation_status"
+        """
+        meta = self._load_meta(url)
+        if meta is None:
+            return None
+        return meta.get("parsed", {}).get(key)
+
+    def store_parsed(self, url, key, result):
+        """
+        Attach a JSON-serializable parse result to the cached body of `url`
+        """
+        with self._lock:
+            meta = self._load_meta(url)
+            if meta is None:
+                return  # Body was not cacheable, so its parse result is not either
+            meta.setdefault("parsed", {})[key] = result
+            self._write(self._paths(url)[1], json.dumps(meta).encode("utf-8"))
+
+    def drop(self, url):
+        """Forget everything cached for `url`, so its next GET is unconditional"""
+        with self._lock:
+            for path in self._paths(url):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+# Connection setup times of the request running on this thread, filled in by the timed connections below
+_connection_times = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_times.connect = time.perf_counter() - start  # DNS lookup + TCP handshake
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_times.connect = time.perf_counter() - start
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connection_times.tls = time.perf_counter() - start - getattr(_connection_times, "connect", 0.0)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections record their connect and TLS times"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool,
+                                                   "https": _TimedHTTPSConnectionPool}
+
+
+class StsciClient:
+    """
+    Keep-alive HTTP client shared by every fetch function in get_nirspec_mos_info
+    ** One requests.Session with a sized connection pool, so a full run reuses a few warm connections **
+
+    e.g. with StsciClient(pool_size=16) as client:
+             data, headers = extract_basic_info_from_GTO(url, client=client)
+
+    Args:
+        pool_size (int): Maximum number of connections kept open per host,
+            should be at least the concurrency used by fetch_observation_statuses
+        timeout (float or tuple): Default timeout (seconds, or (connect, read)) for every request
+        headers (dict): Extra headers sent with every request
+        rate_limiter (AdaptiveRateLimiter): Limiter every request waits on, a new one by default
+        cache (HTTPCache): On-disk response cache, None disables caching
+        retry_policy (RetryPolicy): Retries of fetch(), its connect/read timeouts are used if timeout is None
+        circuit_breaker (CircuitBreaker): Breaker every request waits on, a new one by default
+        base_url (str): If given, every URL is sent to this server instead of its own scheme and host,
+            e.g. "http://127.0.0.1:8000" for the local stand-in server (see stsci_stub_server)
+        metrics (RunMetrics): Where latencies, bytes, retries and cache hits are recorded,
+            the process-wide run_metrics.get_metrics() by default
+    """
+
+    def __init__(self, pool_size=16, timeout=None, headers=None, rate_limiter=None, cache=None, retry_policy=None,
+                 circuit_breaker=None, base_url=None, metrics=None):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout if timeout is not None else self.retry_policy.timeout
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.cache = cache
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.latency = LatencyTracker()
+        self._hedge_pool = None
+        self._hedge_pool_size = pool_size
+        self._hedge_lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        adapter = _TimedAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def rebase(self, url):
+        """
+        Point a www.stsci.edu URL at base_url, keeping its path and query (unchanged without base_url)
+        """
+        if self.base_url is None:
+            return url
+        base = urlsplit(self.base_url)
+        parts = urlsplit(url)
+        if (parts.scheme, parts.netloc) == (base.scheme, base.netloc) and parts.path.startswith(base.path):
+            return url  # Already rebased
+        return urlunsplit((base.scheme, base.netloc, base.path + parts.path, parts.query, ""))
+
+    def get(self, url, **kwargs):
+        """
+        GET a url through the shared connection pool, paced by the rate limiter and circuit breaker of its host
+
+        With a cache, the request is made conditional. A 304 answer is turned into a 200
+        response carrying the cached body, with `response.from_cache` set to True.
+
+        Args:
+            url (str): URL to fetch
+            **kwargs: Passed on to requests.Session.get (timeout defaults to self.timeout)
+        Returns:
+            response (requests.Response): The response, status is not checked here
+        """
+        url = self.rebase(url)
+        sent = kwargs.pop("_sent", None)  # Set by hedged_get to learn when the request leaves
+        kwargs.setdefault("timeout", self.timeout)
+        request_kwargs = dict(kwargs)
+        conditional = self.cache.conditional_headers(url) if self.cache is not None else {}
+        if conditional:
+            kwargs["headers"] = {**conditional, **(kwargs.get("headers") or {})}
+        host = urlsplit(url).netloc
+        self.circuit_breaker.wait(host)
+        try:
+            self.rate_limiter.acquire(host)
+            if sent is not None:
+                sent.set()
+
+            _connection_times.__dict__.clear()
+            start = time.monotonic()
+            response = self.session.get(url, **kwargs)
+        except BaseException as error:
+            # Every error counts as a failure, a probe that ends without a verdict would keep the circuit half-open
+            self.circuit_breaker.record_failure(host)
+            if isinstance(error, requests.RequestException):
+                self.rate_limiter.record(host)
+                self.metrics.inc("http_errors_total", host=host, error=type(error).__name__)
+            raise
+        elapsed = time.monotonic() - start
+        self.rate_limiter.record(host, response.status_code, elapsed, response.headers.get("Retry-After"))
+        self.latency.record(host, elapsed)
+        self._record_metrics(host, response, elapsed)
+        if response.status_code == 429 or response.status_code >= 500:
+            self.circuit_breaker.record_failure(host)
+        else:
+            self.circuit_breaker.record_success(host)
+
+        response.from_cache = False
+        response.cache_url = url
+        if self.cache is not None:
+            if response.status_code == 304:
+                body, headers = self.cache.load_body(url)
+                if body is None and conditional:
+                    # Validators without a body (deleted or half-written entry): ask again for the full page
+                    logger.warning("Cached body of %s is missing, fetching it again", url)
+                    response.close()
+                    self.cache.drop(url)
+                    return self.get(url, **request_kwargs)
+                if body is not None:
+                    response.status_code = 200
+                    response._content = body
+                    response.headers.update(headers)
+                    response.from_cache = True
+            else:
+                self.cache.store(url, response)
+            self.metrics.inc("http_cache_total", result="hit" if response.from_cache else "miss")
+        return response
+
+    def _record_metrics(self, host, response, elapsed):
+        # Split the request time into connection setup, waiting for the headers and reading the body
+        metrics = self.metrics
+        metrics.inc("http_requests_total", host=host, status=str(response.status_code))
+        connect = getattr(_connection_times, "connect", None)
+        tls = getattr(_connection_times, "tls", None)
+        if connect is not None:
+            metrics.inc("http_connections_total", host=host)
+            metrics.observe("http_request_seconds", connect, host=host, phase="connect")
+        if tls is not None:
+            metrics.observe("http_request_seconds", tls, host=host, phase="tls")
+        headers_after = response.elapsed.total_seconds()
+        metrics.observe("http_request_seconds", max(0.0, headers_after - (connect or 0.0) - (tls or 0.0)),
+                        host=host, phase="wait")
+        metrics.observe("http_request_seconds", max(0.0, elapsed - headers_after), host=host, phase="download")
+        metrics.observe("http_request_seconds", elapsed, host=host, phase="total")
+
+        body_bytes = len(response.content)
+        tell = getattr(response.raw, "tell", None)
+        metrics.inc("http_body_bytes_total", body_bytes, host=host)
+        metrics.inc("http_wire_bytes_total", tell() if tell is not None else body_bytes, host=host)
+
+    def fetch(self, url, retries=None, hedge=False, **kwargs):
+        """
+        GET a url, retrying according to the retry policy, and raise if it still fails
+        ** Used by every fetch function in get_nirspec_mos_info **
+
+        Args:
+            url (str): URL to fetch
+            retries (int): Number of retries, defaults to retry_policy.retries
+            hedge (bool): Use hedged_get for every attempt
+            **kwargs: Passed on to get()
+        Returns:
+            response (requests.Response): A successful (2xx/3xx) response
+        Raises:
+            requests.RequestException: Non-retryable error, or retries used up
+        """
+        policy = self.retry_policy
+        retries = policy.retries if retries is None else retries
+        get = self.hedged_get if hedge else self.get
+        attempt = 0
+        while True:
+            try:
+                response = get(url, **kwargs)
+            except requests.RequestException as error:
+                if attempt >= retries or not policy.is_retryable_error(error):
+                    raise
+                delay = policy.delay(attempt)
+                reason = type(error).__name__
+                logger.info("%s for %s: %s. Retrying in %.1fs...", reason, url, error, delay)
+            else:
+                if attempt >= retries or not policy.is_retryable_status(response.status_code):
+                    response.raise_for_status()
+                    return response
+                delay = policy.delay(attempt, response.headers.get("Retry-After"))
+                reason = str(response.status_code)
+                logger.info("HTTP %s for %s. Retrying in %.1fs...", reason, url, delay)
+            self.metrics.inc("http_retries_total", host=urlsplit(self.rebase(url)).netloc, reason=reason)
+            attempt += 1
+            time.sleep(delay)
+
+    def hedged_get(self, url, percentile=95, **kwargs):
+        """
+        GET a url, sending one backup request if the first is slower than usual
+        ** Cuts tail latency: whichever response arrives first is used, the other is dropped **
+
+        The backup goes out once the first request has been in flight for longer than the
+        `percentile` latency of the host, so only about (100 - percentile)% of requests are
+        doubled. Both requests wait on the rate limiter. Until the host has enough latency
+        samples, this is a plain get().
+
+        Args:
+            url (str): URL to fetch
+            percentile (float): Latency percentile after which the backup request is sent
+            **kwargs: Passed on to get()
+        Returns:
+            response (requests.Response): The first successful response
+        """
+        delay = self.latency.percentile(urlsplit(self.rebase(url)).netloc, percentile)
+        if delay is None:
+            return self.get(url, **kwargs)
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                # Room for a first and a backup request per connection, losers can keep running for a while
+                self._hedge_pool = ThreadPoolExecutor(max_workers=2 * self._hedge_pool_size)
+            hedge_pool = self._hedge_pool
+
+        sent = threading.Event()
+        first = hedge_pool.submit(self.get, url, _sent=sent, **kwargs)
+        sent.wait()  # Do not count the time spent waiting on the rate limiter
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        backup = hedge_pool.submit(self.get, url, **kwargs)
+        pending = {first, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        # Not started yet: cancel it, already running: close its response when it lands
+                        if not other.cancel():
+                            other.add_done_callback(_close_response)
+                    self.metrics.inc("http_hedges_total", host=urlsplit(self.rebase(url)).netloc,
+                                     winner="first" if future is first else "backup")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def load_parsed(self, response, key):
+        """
+        Parse result stored for a response that was served from the cache, otherwise None
+        """
+        if self.cache is None or not getattr(response, "from_cache", False):
+            return None
+        parsed = self.cache.load_parsed(response.cache_url, key)
+        self.metrics.inc("parse_cache_total", result="miss" if parsed is None else "hit")
+        return parsed
+
+    def store_parsed(self, response, key, result):
+        """Remember the parse result of a response body for the next 304"""
+        if self.cache is not None:
+            self.cache.store_parsed(response.cache_url, key, result)
+
+    def close(self):
+        with self._hedge_lock:
+            hedge_pool, self._hedge_pool = self._hedge_pool, None
+        if hedge_pool is not None:
+            hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _close_response(future):
+    # Done-callback for the losing request of hedged_get
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_default_client = None
+
+
+def get_default_client():
+    """
+    Return the module-wide StsciClient (cached in ./.stsci_cache), creating it on first use.
+    Fetch functions fall back to this client when none is passed in.
+    Setting the STSCI_BASE_URL environment variable sends its requests to another server.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = StsciClient(cache=HTTPCache(), base_url=os.environ.get("STSCI_BASE_URL"))
+    return _default_client
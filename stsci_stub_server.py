@@ -0,0 +1,363 @@
+"""
+Local stand-in for www.stsci.edu, serving recorded pages so the whole pipeline runs without network
+
+Listing pages are served from <fixtures>/pages/<last part of the URL path>.html (e.g. cycle-1-go.html)
+and cgi-bin/get-visit-status from <fixtures>/status/<id>.html. Latency, timeouts and HTTP errors can
+be injected to exercise the retries, rate limiter, circuit breaker and hedging of StsciClient.
+
+e.g. python stsci_stub_server.py --port 8000 --latency 0.2 --jitter 0.1 --error-rate 0.05
+     python get_nirspec_mos_info.py --base-url http://127.0.0.1:8000
+
+     with StubStsci(latency=0.05) as stub:
+         client = StsciClient(base_url=stub.base_url)
+         df = asyncio.run(harvest(client=client))
+
+The bundled fixtures/ were rebuilt from the outputs saved in get_info.ipynb (see fixtures_from_notebook),
+record_fixtures replaces them with fresh copies of the real pages.
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import ast
+import gzip
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import threading
+
+from get_nirspec_mos_info import DEFAULT_SOURCES, STATUS_URL, iter_basic_info
+from status_store import normalize_proposal_id
+from stsci_client import StsciClient
+
+
+# What the status endpoint answers for a proposal without a fixture
+NO_VISITS_PAGE = b"<html><body><p>No visits found for this program.</p></body></html>"
+
+
+class StubStsci:
+    """
+    Threaded HTTP server answering like www.stsci.edu from a fixtures directory
+    ** Point a StsciClient at it with base_url=stub.base_url **
+
+    Faults are drawn independently for every request: with probability timeout_rate the
+    request stalls for `stall` seconds before it is answered (longer than the client's read
+    timeout, so it times out), otherwise with probability error_rate it gets one of error_statuses.
+
+    Args:
+        fixtures (str): Directory holding pages/ and status/
+        host (str): Interface to listen on
+        port (int): Port to listen on, 0 picks a free one
+        latency (float): Seconds added to every answer
+        jitter (float): Extra random latency, uniform in [0, jitter] seconds
+        error_rate (float): Fraction of requests answered with an HTTP error
+        error_statuses (tuple): Statuses the errors are drawn from
+        timeout_rate (float): Fraction of requests that stall
+        stall (float): How long a stalled request hangs, in seconds
+        seed (int): Seed of the fault and jitter draws, for reproducible runs
+    """
+
+    def __init__(self, fixtures="fixtures", host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_statuses=(500, 502, 503, 429), timeout_rate=0.0, stall=65.0, seed=None):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.timeout_rate = timeout_rate
+        self.stall = stall
+        self.hits = Counter()  # (path kind, status) -> number of answers
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}  # fixture path -> (body, gzipped body, etag)
+        self._stopped = threading.Event()
+        self._thread = None
+
+        handler = type("Handler", (_StubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread, returns base_url"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._stopped.set()  # Release stalled requests
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def draw_fault(self):
+        """
+        Decide what happens to one request: (seconds to wait before answering, injected status or None)
+        """
+        with self._lock:
+            draw = self._random.random()
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if draw < self.timeout_rate:
+                return self.stall, None
+            if draw < self.timeout_rate + self.error_rate:
+                return delay, self._random.choice(self.error_statuses)
+            return delay, None
+
+    def wait(self, seconds):
+        # Interrupted by stop(), so a stalled request does not keep the server alive
+        self._stopped.wait(seconds)
+
+    def fixture_path(self, path, query):
+        """
+        Fixture file for a request path, (None, kind) if there is no such page
+        """
+        if path.rstrip("/").endswith("/cgi-bin/get-visit-status"):
+            proposal_id = (query.get("id") or [""])[0]
+            if not proposal_id.isdigit():
+                return None, "status"
+            return os.path.join(self.fixtures, "status", f"{int(proposal_id)}.html"), "status"
+        name = path.rstrip("/").rsplit("/", 1)[-1]
+        if not re.fullmatch(r"[\w.-]+", name):
+            return None, "page"
+        return os.path.join(self.fixtures, "pages", f"{name}.html"), "page"
+
+    def load(self, path):
+        """(body, gzipped body, etag) of a fixture, read once and kept in memory"""
+        with self._lock:
+            cached = self._bodies.get(path)
+        if cached is None:
+            with open(path, "rb") as f:
+                body = f.read()
+            cached = (body, gzip.compress(body), '"%s"' % hashlib.sha1(body).hexdigest())
+            with self._lock:
+                self._bodies[path] = cached
+        return cached
+
+    def count(self, kind, status):
+        with self._lock:
+            self.hits[kind, status] += 1
+
+    def summary(self):
+        """One line with the number of answers per path kind and status, e.g. page 200: 5, page stall: 1"""
+        with self._lock:
+            hits = sorted(self.hits.items(), key=lambda item: (item[0][0], str(item[0][1])))
+        return ", ".join(f"{kind} {status}: {n}" for (kind, status), n in hits)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes, do not hold the body back
+    stub = None  # Set on the subclass made by StubStsci
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path, kind = self.stub.fixture_path(parts.path, parse_qs(parts.query))
+
+        delay, error = self.stub.draw_fault()
+        if delay >= self.stub.stall:
+            self.stub.count(kind, "stall")
+        if delay:
+            self.stub.wait(delay)
+        if error is not None:
+            self.stub.count(kind, error)
+            return self._send(error, b"Injected error", extra={"Retry-After": "1"} if error == 429 else None)
+
+        if path is None or not os.path.exists(path):
+            if kind == "status" and path is not None:
+                self.stub.count(kind, 200)
+                return self._send(200, NO_VISITS_PAGE)
+            self.stub.count(kind, 404)
+            return self._send(404, b"Not found")
+
+        body, gzipped, etag = self.stub.load(path)
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self.stub.count(kind, 304)
+            return self._send(304, b"", extra={"ETag": etag})
+        self.stub.count(kind, 200)
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            return self._send(200, gzipped, extra={"ETag": etag, "Content-Encoding": "gzip"})
+        self._send(200, body, extra={"ETag": etag})
+
+    def _send(self, status, body, extra=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            if body:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up, e.g. on a stalled request
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown everything else, see StubStsci.hits
+
+
+def record_fixtures(directory="fixtures", sources=DEFAULT_SOURCES, proposal_ids=None, client=None):
+    """
+    Save fresh copies of the listing pages and of the visit status pages of their programs
+    ** Needs network access to www.stsci.edu, the result is what StubStsci serves **
+
+    Args:
+        directory (str): Fixtures directory, pages/ and status/ are written inside it
+        sources (list): Listing pages to record, see DEFAULT_SOURCES
+        proposal_ids (iterable): Proposals to record the status of, by default every
+            NIRSpec/MOS (NIRSpec for DDT) program of the sources
+        client (StsciClient): HTTP client, a new uncached one by default
+    Returns:
+        n_pages (int): Number of pages written
+    """
+    client = client or StsciClient()
+    os.makedirs(os.path.join(directory, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "status"), exist_ok=True)
+
+    n_pages = 0
+    found_ids = []
+    for source in sources:
+        response = client.fetch(source.url)
+        name = urlsplit(source.url).path.rstrip("/").rsplit("/", 1)[-1]
+        _write(os.path.join(directory, "pages", f"{name}.html"), response.content)
+        n_pages += 1
+        if proposal_ids is None:
+            found_ids.extend(row.proposal_id for row in iter_basic_info(source, client))
+
+    for proposal_id in dict.fromkeys(map(normalize_proposal_id, proposal_ids or found_ids)):
+        response = client.fetch(STATUS_URL.format(proposal_id=proposal_id))
+        _write(os.path.join(directory, "status", f"{proposal_id}.html"), response.content)
+        n_pages += 1
+    print(f"{n_pages} pages recorded in {directory}")
+    return n_pages
+
+
+def _write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+# Listing page layouts, as described in get_info.ipynb (GO tables sit under accordion titles)
+LISTING_HEADERS = {
+    "GO": ["ID", "Program Title", "PI & Co-PIs", "Exclusive Access Period (months)", "Prime/ Parallel Time (hours)",
+           "Instrument/ Mode", "Type"],
+    "GTO": ["ID", "Program Title", "Principal Investigator", "AR?", "Instrument/Mode", "Allocated Hours"],
+    "DDT": ["PID", "Title", "PI", "Instruments", "Allocated Hours", "Cycle"],
+}
+LISTING_MODES = {"GO": ("Instrument/ Mode", "NIRSpec/MOS"), "GTO": ("Instrument/Mode", "NIRSpec/MOS"),
+                 "DDT": ("Instruments", "NIRSpec")}
+
+
+def fixtures_from_notebook(notebook="get_info.ipynb", directory="fixtures"):
+    """
+    Rebuild fixtures from the status output saved in the notebook
+    ** How the bundled fixtures/ were made, while www.stsci.edu was not reachable **
+
+    Every "Headers:" / "Row data:" block printed by the status cells becomes one <td>-header
+    table of status/<id>.html, so the status pages hold the real visit rows (rows whose length
+    did not match their headers were never printed and are missing). The listing pages only
+    hold the program IDs of each cell with the NIRSpec mode filled in, all GO programs are
+    listed on cycle-1-go.html since the output does not say which cycle they belong to.
+
+    Returns:
+        ids (dict): {"GO"/"GTO"/"DDT": [proposal IDs]}
+    """
+    with open(notebook, "r", encoding="utf-8") as f:
+        cells = json.load(f)["cells"]
+    os.makedirs(os.path.join(directory, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "status"), exist_ok=True)
+
+    ids = {"GO": [], "GTO": [], "DDT": []}
+    kind = None
+    for cell in cells:
+        match = re.search(r"read_csv\('\w+?_(GO|GTO|DDT)\.csv'\)", "".join(cell["source"]))
+        kind = match.group(1) if match else kind
+        text = "".join("".join(output.get("text", "")) for output in cell.get("outputs", []))
+        for block in text.split("Fetching status for Proposal ID: ")[1:]:
+            proposal_id, _, block = block.partition("\n")
+            tables = []
+            for line in block.split("\n"):
+                if line.startswith("Headers: "):
+                    tables.append((ast.literal_eval(line[len("Headers: "):]), []))
+                elif line.startswith("Row data: ") and tables:
+                    tables[-1][1].append(ast.literal_eval(line[len("Row data: "):]))
+            _write(os.path.join(directory, "status", f"{proposal_id}.html"), _status_page(proposal_id, tables))
+            ids[kind].append(proposal_id)
+
+    pages = [("cycle-1-go", "GO", ids["GO"]), ("cycle-2-go", "GO", []), ("cycle-3-go", "GO", []),
+             ("guaranteed-time-observations", "GTO", ids["GTO"]), ("directors-discretionary-time", "DDT", ids["DDT"])]
+    for name, kind, listed in pages:
+        _write(os.path.join(directory, "pages", f"{name}.html"), _listing_page(kind, listed))
+    return ids
+
+
+def _status_page(proposal_id, tables):
+    out = [f"<html><body><h2>Program {proposal_id}</h2>"]
+    for headers, rows in tables:
+        out.append("<table>")
+        for row in [headers] + rows:
+            out.append("<tr>" + "".join(f"<td>{html.escape(value)}</td>" for value in row) + "</tr>")
+        out.append("</table>")
+    out.append("</body></html>\n")
+    return "\n".join(out).encode("utf-8")
+
+
+def _listing_page(kind, proposal_ids):
+    headers = LISTING_HEADERS[kind]
+    mode_column, mode = LISTING_MODES[kind]
+    out = ["<html><body>"]
+    if kind == "GO":
+        out.append('<div class="accordion"><span class="accordion__title-text">Recorded programs</span></div>')
+    out.append("<table>")
+    out.append("<tr>" + "".join(f"<th>{html.escape(header)}</th>" for header in headers) + "</tr>")
+    for proposal_id in proposal_ids:
+        values = {headers[0]: proposal_id, mode_column: mode}
+        out.append("<tr>" + "".join(f"<td>{html.escape(values.get(header, ''))}</td>" for header in headers) + "</tr>")
+    out.append("</table></body></html>\n")
+    return "\n".join(out).encode("utf-8")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--fixtures", default="fixtures", help="directory holding pages/ and status/")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 5xx/429")
+    arg_parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that stall")
+    arg_parser.add_argument("--stall", type=float, default=65.0, help="seconds a stalled request hangs")
+    arg_parser.add_argument("--seed", type=int, help="seed of the fault draws")
+    arg_parser.add_argument("--record", action="store_true", help="record fresh fixtures from www.stsci.edu and exit")
+    args = arg_parser.parse_args(argv)
+
+    if args.record:
+        record_fixtures(args.fixtures)
+        return
+
+    stub = StubStsci(args.fixtures, args.host, args.port, args.latency, args.jitter, args.error_rate,
+                     timeout_rate=args.timeout_rate, stall=args.stall, seed=args.seed)
+    print(f"Serving {args.fixtures} on {stub.base_url}, stop with Ctrl+C")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        print(stub.summary())
+
+
+if __name__ == "__main__":
+    main()
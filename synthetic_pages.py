@@ -0,0 +1,358 @@
+"""
+Synthetic jwst pages in the structure of the real ones, for scale testing the extractors
+
+GO pages have a table per accordion topic (accordion__title-text) with <th> headers, the GTO page
+an "AR?" column of icons, the DDT page an "Instruments" column, and get-visit-status pages one
+<td>-header table per kind of visit (executed, planned, skipped), like the real site.
+
+e.g. python synthetic_pages.py -o synthetic --programs 20000 --visits 30
+     python stsci_stub_server.py --fixtures synthetic
+     python benchmark_parsers.py --scale 1000 10000 100000
+"""
+from datetime import datetime, timedelta
+from functools import partial
+import argparse
+import html
+import os
+import random
+
+
+GO_HEADERS = ["ID", "Program Title", "PI & Co-PIs", "Exclusive Access Period (months)", "Prime/ Parallel Time (hours)",
+              "Instrument/ Mode", "Type"]
+GTO_HEADERS = ["ID", "Program Title", "Principal Investigator", "AR?", "Instrument/Mode", "Allocated Hours"]
+DDT_HEADERS = ["PID", "Title", "PI", "Instruments", "Allocated Hours", "Cycle"]
+
+# Visit tables of get-visit-status, by kind of visit
+STATUS_HEADERS = ["Observation", "Visit", "Status", "Targets", "Template", "Hours"]
+EXECUTED_STATUSES = ["Archived", "Archived", "Archived", "FailedArchived", "Executed"]
+PLANNED_STATUSES = ["Implementation", "Flight Ready", "Scheduled"]
+SKIPPED_STATUSES = ["Skipped", "Withdrawn"]
+
+MODES = ["NIRSpec/MOS", "NIRSpec/IFU", "NIRSpec/FS", "NIRCam/Imaging", "NIRCam/WFSS", "MIRI/Imaging", "MIRI/MRS",
+         "NIRISS/WFSS", "NIRISS/SOSS"]
+TEMPLATES = {"NIRSpec/MOS": "NIRSpec MultiObject Spectroscopy", "NIRSpec/IFU": "NIRSpec IFU Spectroscopy",
+             "NIRSpec/FS": "NIRSpec Fixed Slit Spectroscopy", "NIRCam/Imaging": "NIRCam Imaging",
+             "NIRCam/WFSS": "NIRCam Wide Field Slitless Spectroscopy", "MIRI/Imaging": "MIRI Imaging",
+             "MIRI/MRS": "MIRI Medium Resolution Spectroscopy",
+             "NIRISS/WFSS": "NIRISS Wide Field Slitless Spectroscopy",
+             "NIRISS/SOSS": "NIRISS Single Object Slitless Spectroscopy"}
+TOPICS = ["Galaxies", "Stellar Physics", "Exoplanets and Exoplanet Formation", "Large Scale Structure of the Universe",
+          "Supermassive Black Holes and Active Galaxies", "Solar System Astronomy", "Stellar Populations",
+          "Intergalactic and Circumgalactic Medium", "Planetary Systems and Star Formation"]
+
+EPOCH = datetime(2022, 7, 1)
+
+
+class PageQuirks:
+    """
+    Structure quirks of the generated pages, the kind the real pages have or had at some point
+    ** Each rate is the fraction of pages, tables, rows or cells the quirk is applied to **
+
+    e.g. PageQuirks(ragged_rows=0.05), NO_QUIRKS for perfectly regular pages
+
+    Args:
+        header_variant (float): Pages using the other spelling of the mode header
+            ("Instrument/Mode" on GO, "Instrument/ Mode" on GTO)
+        mode_spacing (float): GO mode cells with stray spaces and line breaks, e.g. "NIRSpec/ MOS\\n"
+        multi_mode (float): Mode cells listing several modes separated by <br>
+        ragged_rows (float): Rows with one cell missing or one too many (skipped by the extractors)
+        empty_tables (float): Tables with a header row and no rows
+        thead (float): Tables with their header row in <thead> and the rows in <tbody>
+        nested_markup (float): Text cells wrapped in links or italics, with entities and &nbsp;
+    """
+
+    def __init__(self, header_variant=0.2, mode_spacing=0.2, multi_mode=0.3, ragged_rows=0.01, empty_tables=0.05,
+                 thead=0.5, nested_markup=0.3):
+        self.header_variant = header_variant
+        self.mode_spacing = mode_spacing
+        self.multi_mode = multi_mode
+        self.ragged_rows = ragged_rows
+        self.empty_tables = empty_tables
+        self.thead = thead
+        self.nested_markup = nested_markup
+
+
+NO_QUIRKS = PageQuirks(0, 0, 0, 0, 0, 0, 0)
+
+
+class _Writer:
+    # Shared helpers of the page generators, one per page so that a seed gives the same page
+    def __init__(self, quirks, seed):
+        self.quirks = quirks if quirks is not None else PageQuirks()
+        self.random = random.Random(seed)
+        self.out = []
+
+    def chance(self, rate):
+        return rate > 0 and self.random.random() < rate
+
+    def text(self, value):
+        value = html.escape(value)
+        if self.chance(self.quirks.nested_markup):
+            value = self.random.choice([f'<a href="#">{value}</a>', f"<i>{value}</i>", f"{value}&nbsp;",
+                                        f"<span>{value}</span> "])
+        return value
+
+    def modes(self, mos_fraction):
+        # Main mode of a program, plus a few others on multi_mode cells
+        main_mode = "NIRSpec/MOS" if self.random.random() < mos_fraction else self.random.choice(MODES[1:])
+        modes = [main_mode]
+        if self.chance(self.quirks.multi_mode):
+            modes += self.random.sample([mode for mode in MODES[1:] if mode != main_mode], self.random.randint(1, 3))
+            self.random.shuffle(modes)
+        return modes
+
+    def mode_cell(self, modes, spacing=False):
+        cell = "<br>".join(modes)
+        if spacing and self.chance(self.quirks.mode_spacing):
+            cell = cell.replace("/", self.random.choice(["/ ", " /", "/\n"])) + self.random.choice(["\n", " ", "\r\n"])
+        return cell
+
+    def table(self, headers, rows, header_tag):
+        """
+        Write a table of (key, cells) rows, cells hold escaped HTML. Returns the keys of the
+        rows written with the right number of cells, i.e. the rows the extractors can read
+        """
+        with_thead = self.chance(self.quirks.thead)
+        self.out.append("<table>")
+        header_row = "<tr>" + "".join(f"<{header_tag}>{html.escape(header)}</{header_tag}>" for header in headers) + "</tr>"
+        self.out.append(f"<thead>{header_row}</thead><tbody>" if with_thead else header_row)
+        readable = []
+        if not self.chance(self.quirks.empty_tables):
+            for key, cells in rows:
+                if self.chance(self.quirks.ragged_rows):
+                    cells = cells[:-1] if self.random.random() < 0.5 else cells + [""]
+                else:
+                    readable.append(key)
+                self.out.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+        self.out.append("</tbody></table>" if with_thead else "</table>")
+        return readable
+
+    def page(self):
+        return ("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"></head><body>\n" + "\n".join(self.out)
+                + "\n</body></html>\n").encode("utf-8")
+
+    def matching(self, rows, headers, header_tag, selected):
+        # Write the table, return the selected IDs among its readable rows
+        return [proposal_id for proposal_id in self.table(headers, rows, header_tag) if proposal_id in selected]
+
+
+def go_page(n_programs, n_topics=20, mos_fraction=0.1, quirks=None, seed=0, first_id=1000):
+    """
+    Generate a GO cycle page
+    ** One accordion topic per table, programs spread evenly over the topics **
+
+    Args:
+        n_programs (int): Number of program rows
+        n_topics (int): Number of topics (tables)
+        mos_fraction (float): Fraction of programs whose mode is NIRSpec/MOS
+        quirks (PageQuirks): Structure quirks, PageQuirks() by default
+        seed (int): Random seed, the same arguments give the same page
+        first_id (int): ID of the first program, the others follow
+    Returns:
+        content (bytes): HTML of the page
+        mos_ids (list): IDs of the NIRSpec/MOS programs on readable rows, i.e. the programs
+            extract_basic_info_from_GO keeps
+    """
+    writer = _Writer(quirks, seed)
+    headers = list(GO_HEADERS)
+    if writer.chance(writer.quirks.header_variant):
+        headers[headers.index("Instrument/ Mode")] = "Instrument/Mode"
+
+    mos_ids = []
+    per_topic = -(-n_programs // max(1, n_topics))
+    for topic_index, start in enumerate(range(0, n_programs, per_topic)):
+        topic = TOPICS[topic_index % len(TOPICS)] + (f" {topic_index // len(TOPICS) + 1}" if topic_index >= len(TOPICS) else "")
+        rows = []
+        selected = set()
+        for proposal_id in range(first_id + start, first_id + min(start + per_topic, n_programs)):
+            modes = writer.modes(mos_fraction)
+            if "NIRSpec/MOS" in modes:
+                selected.add(proposal_id)
+            rows.append((proposal_id, [str(proposal_id), writer.text(f"Program {proposal_id}: a survey of {topic.lower()}"),
+                         writer.text(f"PI {proposal_id % 997}") + "<br>" + writer.text(f"Co-PI {proposal_id % 991}"),
+                         str(writer.random.choice([0, 12, 12, 24])),
+                         f"{writer.random.uniform(1, 300):.1f}", writer.mode_cell(modes, spacing=True),
+                         writer.random.choice(["GO", "GO", "AR", "Calibration"])]))
+        writer.out.append(f'<div class="accordion"><button class="accordion__title">'
+                          f'<span class="accordion__title-text">{html.escape(topic)}</span></button><div>')
+        mos_ids.extend(writer.matching(rows, headers, "th", selected))
+        writer.out.append("</div></div>")
+    return writer.page(), mos_ids
+
+
+def gto_page(n_programs, mos_fraction=0.1, quirks=None, seed=0, first_id=1100):
+    """
+    Generate the GTO page, one table with an "AR?" column holding an icon on some rows
+    ** Returns (content, mos_ids) like go_page **
+    """
+    writer = _Writer(quirks, seed)
+    headers = list(GTO_HEADERS)
+    if writer.chance(writer.quirks.header_variant):
+        headers[headers.index("Instrument/Mode")] = "Instrument/ Mode"
+
+    rows = []
+    selected = set()
+    for proposal_id in range(first_id, first_id + n_programs):
+        modes = writer.modes(mos_fraction)
+        if "NIRSpec/MOS" in modes:
+            selected.add(proposal_id)
+        ar = '<img src="/files/ar-icon.png" alt="AR">' if writer.random.random() < 0.3 else ""
+        rows.append((proposal_id, [str(proposal_id), writer.text(f"GTO program {proposal_id}"),
+                                   writer.text(f"PI {proposal_id % 89}"), ar, writer.mode_cell(modes),
+                                   f"{writer.random.uniform(1, 100):.1f}"]))
+    mos_ids = writer.matching(rows, headers, "th", selected)
+    return writer.page(), mos_ids
+
+
+def ddt_page(n_programs, nirspec_fraction=0.2, quirks=None, seed=0, first_id=6500):
+    """
+    Generate the DDT page, one table with an "Instruments" column (e.g. "NIRCam, NIRSpec")
+    ** Returns (content, nirspec_ids) like go_page **
+    """
+    writer = _Writer(quirks, seed)
+    instruments = ["NIRCam", "NIRSpec", "MIRI", "NIRISS"]
+
+    rows = []
+    selected = set()
+    for proposal_id in range(first_id, first_id + n_programs):
+        used = writer.random.sample(instruments[:1] + instruments[2:], writer.random.randint(1, 2))
+        if writer.random.random() < nirspec_fraction:
+            used.append("NIRSpec")
+            selected.add(proposal_id)
+        rows.append((proposal_id, [str(proposal_id), writer.text(f"DDT program {proposal_id}"),
+                                   writer.text(f"PI {proposal_id % 53}"), ", ".join(sorted(used)),
+                                   f"{writer.random.uniform(0.5, 40):.1f}", str(writer.random.randint(1, 4))]))
+    nirspec_ids = writer.matching(rows, DDT_HEADERS, "th", selected)
+    return writer.page(), nirspec_ids
+
+
+def status_page(proposal_id, n_visits, mos_fraction=0.5, quirks=None, seed=0):
+    """
+    Generate a get-visit-status page
+    ** Visits are split into an executed (Start UT / End UT), a planned (Plan Windows)
+    and a skipped table, each with its own <td> header row **
+
+    Args:
+        proposal_id (int): Program the visits belong to
+        n_visits (int): Number of visit rows over all tables
+        mos_fraction (float): Fraction of visits with the NIRSpec MultiObject Spectroscopy template
+        quirks (PageQuirks): Structure quirks, PageQuirks() by default
+        seed (int): Random seed
+    Returns:
+        content (bytes): HTML of the page
+    """
+    writer = _Writer(quirks, f"{seed}:{proposal_id}")
+    rand = writer.random
+    tables = {"executed": [], "planned": [], "skipped": []}
+    with_repeat = rand.random() < 0.4
+
+    for visit in range(n_visits):
+        kind = rand.choices(["executed", "planned", "skipped"], [0.7, 0.2, 0.1])[0]
+        template = TEMPLATES["NIRSpec/MOS"] if rand.random() < mos_fraction else TEMPLATES[rand.choice(MODES[1:])]
+        status = rand.choice({"executed": EXECUTED_STATUSES, "planned": PLANNED_STATUSES,
+                              "skipped": SKIPPED_STATUSES}[kind])
+        hours = rand.uniform(0.2, 25)
+        cells = [str(visit // 4 + 1), str(visit % 4 + 1), status, writer.text(f"TARGET-{proposal_id}-{visit // 4}"),
+                 template, f"{hours:.2f}"]
+        if kind == "executed":
+            start = EPOCH + timedelta(seconds=rand.uniform(0, 3 * 365 * 86400))
+            cells += [_ut(start), _ut(start + timedelta(hours=hours))]
+        elif kind == "planned":
+            cells.append(_plan_windows(rand))
+        if with_repeat:
+            cells.append("" if rand.random() < 0.8 else
+                         f"Repeat of observation {rand.randint(1, 40)} visit 1 in this program by"
+                         f"<a href=\"#\">WOPR{rand.randint(88000, 89999)}</a>")
+        tables[kind].append((visit, cells))
+
+    writer.out.append(f"<h2>Program {proposal_id}</h2>")
+    extra = {"executed": ["Start UT", "End UT"], "planned": ["Plan Windows"], "skipped": []}
+    for kind, rows in tables.items():
+        if rows:
+            writer.table(STATUS_HEADERS + extra[kind] + (["Repeat"] if with_repeat else []), rows, "td")
+    return writer.page()
+
+
+def _ut(moment):
+    return f"{moment:%b} {moment.day}, {moment:%Y %H:%M:%S}"
+
+
+def _plan_windows(rand):
+    # e.g. "Sep 14, 2024 - Oct 3, 2024 (2024.258 - 2024.277)", sometimes several windows or none yet
+    if rand.random() < 0.1:
+        return "Ready for long range planning, plan window not yet assigned"
+    windows = []
+    start = EPOCH + timedelta(days=rand.uniform(700, 1400))
+    for _ in range(1 if rand.random() < 0.85 else rand.randint(2, 3)):
+        end = start + timedelta(days=rand.randint(5, 60))
+        windows.append(f"{start:%b} {start.day}, {start:%Y} - {end:%b} {end.day}, {end:%Y} "
+                       f"({start:%Y.%j} - {end:%Y.%j})")
+        start = end + timedelta(days=rand.randint(30, 120))
+    return "<br>".join(windows)
+
+
+def write_catalog(directory, n_programs=10000, visits_per_program=20, mos_fraction=0.1, quirks=None, seed=0):
+    """
+    Write a whole synthetic catalog in the fixtures layout served by stsci_stub_server
+    ** pages/cycle-{1,2,3}-go.html, pages/guaranteed-time-observations.html,
+    pages/directors-discretionary-time.html and status/<id>.html for every program the pipeline fetches **
+
+    GO programs are split over the three cycles, the GTO page gets a tenth of n_programs
+    and the DDT page a twentieth. Programs get between 1 and 2 x visits_per_program visits.
+
+    Returns:
+        counts (dict): Number of programs per page and of status pages and visits written
+    """
+    quirks = quirks if quirks is not None else PageQuirks()
+    rand = random.Random(seed)
+    os.makedirs(os.path.join(directory, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "status"), exist_ok=True)
+
+    per_cycle = [n_programs // 3, n_programs // 3, n_programs - 2 * (n_programs // 3)]
+    pages = [(f"cycle-{cycle}-go", n, partial(go_page, n, 20, mos_fraction)) for cycle, n in zip((1, 2, 3), per_cycle)]
+    pages += [("guaranteed-time-observations", max(1, n_programs // 10), partial(gto_page, max(1, n_programs // 10),
+                                                                                 mos_fraction)),
+              ("directors-discretionary-time", max(1, n_programs // 20), partial(ddt_page, max(1, n_programs // 20),
+                                                                                 2 * mos_fraction))]
+    counts = {}
+    fetched_ids = []
+    for index, (name, n, make_page) in enumerate(pages):
+        # IDs of every page in their own range, so no program is listed twice
+        content, ids = make_page(quirks=quirks, seed=seed + index, first_id=1000 + index * 100000)
+        _write(os.path.join(directory, "pages", f"{name}.html"), content)
+        counts[name] = n
+        fetched_ids.extend(ids)
+
+    n_visits = 0
+    for proposal_id in fetched_ids:
+        visits = rand.randint(1, 2 * visits_per_program)
+        _write(os.path.join(directory, "status", f"{proposal_id}.html"),
+               status_page(proposal_id, visits, quirks=quirks, seed=seed))
+        n_visits += visits
+    counts["status pages"] = len(fetched_ids)
+    counts["visits"] = n_visits
+    return counts
+
+
+def _write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("-o", "--output", default="synthetic", help="directory to write pages/ and status/ to")
+    arg_parser.add_argument("--programs", type=int, default=10000, help="GO programs over the three cycles")
+    arg_parser.add_argument("--visits", type=int, default=20, help="mean visits per fetched program")
+    arg_parser.add_argument("--mos-fraction", type=float, default=0.1, help="fraction of NIRSpec/MOS programs")
+    arg_parser.add_argument("--no-quirks", action="store_true", help="perfectly regular pages")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    counts = write_catalog(args.output, args.programs, args.visits, args.mos_fraction,
+                           NO_QUIRKS if args.no_quirks else None, args.seed)
+    print(", ".join(f"{name}: {n}" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import time
+
+from html_backends import get_backend
+from run_metrics import get_metrics
+
+
+class TableSpec:
+    """
+    Declarative description of which rows to keep from the tables of a page
+    ** Used by extract_tables, the single extraction loop behind every parse_* function **
+
+    e.g. TableSpec(("Instruments",), lambda text: "NIRSpec" in text)
+
+    Args:
+        filter_columns (tuple): Header names of the filter column, the first one present is used
+        predicate (callable): Called with the text of the filter cell, the row is kept if it returns True.
+            None keeps every row, whether or not the table has the filter column
+        header_tag (str): Tag of the header cells in the first row ('th' on listing pages,
+            'td' on get-visit-status pages)
+        shared_headers (bool): If True the first table's headers are used for every table on the page,
+            otherwise every table is read with its own headers (and tables without headers are skipped)
+        topic_class (str): Class of the <span> titles paired one-to-one with the tables, if any
+        image_flags (dict): {header: value}, cells of that column holding an <img> are read as value
+        name (str): Page type the metrics of the spec are recorded under, e.g. "GO"
+    """
+
+    def __init__(self, filter_columns, predicate, header_tag='th', shared_headers=True, topic_class=None,
+                 image_flags=None, name=None):
+        self.filter_columns = tuple(filter_columns)
+        self.predicate = predicate
+        self.header_tag = header_tag
+        self.shared_headers = shared_headers
+        self.topic_class = topic_class
+        self.image_flags = image_flags or {}
+        self.name = name
+        self._plans = {}  # header signature -> (filter index, [(image column index, value)])
+
+    def plan(self, headers):
+        """
+        Resolve a header signature to column indexes, once per distinct signature
+        """
+        signature = tuple(headers)
+        plan = self._plans.get(signature)
+        if plan is None:
+            filter_index = next((headers.index(column) for column in self.filter_columns if column in headers), None)
+            image_indexes = [(headers.index(column), value) for column, value in self.image_flags.items()
+                             if column in headers]
+            plan = self._plans[signature] = (filter_index, image_indexes)
+        return plan
+
+    def keep_all(self):
+        """Same spec without the row filter, for storing every row and filtering offline"""
+        return TableSpec(self.filter_columns, None, self.header_tag, self.shared_headers, self.topic_class,
+                         self.image_flags, self.name)
+
+    def accepts(self, headers, values):
+        """
+        Apply the row filter to a row that was already read, e.g. one kept by keep_all()
+        """
+        if self.predicate is None:
+            return True
+        filter_index = self.plan(headers)[0]
+        return filter_index is not None and self.predicate(values[filter_index])
+
+
+class ExtractedTables:
+    """
+    Result of extract_tables
+
+    Attributes:
+        headers (list): Headers of the first table (None if the page has no table with rows)
+        all_headers (list): Ordered union of the headers of all tables
+        rows (list): List of (headers, topic, values) for every kept row, where headers are the
+            headers the row was read with and topic the title of its table (None without topic_class)
+        dom_seconds (float): Time spent building the tree of the page
+    """
+
+    def __init__(self):
+        self.headers = None
+        self.all_headers = []
+        self.rows = []
+        self.dom_seconds = 0.0
+
+
+def extract_tables(content, spec, parser="auto", metrics=None):
+    """
+    Extract the rows selected by a TableSpec from every table of a page, in one pass
+    ** Only the filter cell is read before a row is accepted, the rest of the row only if it is kept **
+
+    Args:
+        content (bytes or str): HTML of the page
+        spec (TableSpec): What to keep
+        parser (str): HTML parser backend, "auto", "selectolax", "lxml" or "html.parser"
+        metrics (RunMetrics): Where parse times and row counts are recorded, run_metrics.get_metrics() by default
+    Returns:
+        result (ExtractedTables): Kept rows and the headers they were read with
+    """
+    metrics = metrics if metrics is not None else get_metrics()
+    start = time.perf_counter()
+    result = ExtractedTables()
+    result.rows = list(_walk_tables(content, spec, parser, result, metrics))
+    page = spec.name or "unnamed"
+    metrics.observe("parse_seconds", result.dom_seconds, page=page, step="dom")
+    metrics.observe("parse_seconds", time.perf_counter() - start - result.dom_seconds, page=page, step="extract")
+    return result
+
+
+def iter_table_rows(content, spec, parser="auto", metrics=None):
+    """
+    Generator version of extract_tables, yielding (headers, topic, values) for each kept row as it is read
+    """
+    return _walk_tables(content, spec, parser, ExtractedTables(), metrics if metrics is not None else get_metrics())
+
+
+def _walk_tables(content, spec, parser, result, metrics):
+    # Fills in result.headers / result.all_headers while yielding the kept rows
+    backend = get_backend(parser)
+    start = time.perf_counter()
+    doc = backend.parse(content)
+    result.dom_seconds = time.perf_counter() - start
+    text = backend.text
+    keep_all = spec.predicate is None
+    counts = {"kept": 0, "filtered": 0, "ragged": 0}
+    try:
+        tables = backend.tables(doc)
+        if spec.topic_class is not None:
+            pairs = zip(backend.span_texts(doc, spec.topic_class), tables)
+        else:
+            pairs = ((None, table) for table in tables)
+
+        for topic, table in pairs:
+            rows = backend.rows(table)
+            if not rows:
+                continue  # Skip empty tables
+
+            # Assuming first row is headers
+            if not spec.shared_headers or result.headers is None:
+                headers = [text(header) for header in backend.cells(rows[0], spec.header_tag)]
+                if result.headers is None:
+                    result.headers = headers
+                if not spec.shared_headers and not headers:
+                    continue
+                result.all_headers.extend([header for header in headers if header not in result.all_headers])
+                filter_index, image_indexes = spec.plan(headers)
+            if filter_index is None and not keep_all:
+                counts["filtered"] += len(rows) - 1
+                continue  # No filter column, nothing on this table can match
+
+            n_columns = len(headers)
+            for row in rows[1:]:
+                columns = backend.cells(row, 'td')
+                if len(columns) != n_columns:
+                    counts["ragged"] += 1
+                    continue  # Skip rows that do not match the header length
+                if not keep_all and not spec.predicate(text(columns[filter_index])):
+                    counts["filtered"] += 1
+                    continue
+
+                values = [text(column) for column in columns]
+                for index, value in image_indexes:
+                    if backend.has_img(columns[index]):
+                        values[index] = value
+                counts["kept"] += 1
+                yield headers, topic, values
+    finally:
+        # Also when the consumer stops early, e.g. a closed iter_table_rows generator
+        for outcome, n in counts.items():
+            if n:
+                metrics.inc("rows_total", n, page=spec.name or "unnamed", outcome=outcome)
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from run_metrics import RunMetrics
+from stsci_client import AdaptiveRateLimiter, StsciClient
+from stsci_stub_server import StubStsci
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+
+def fast_client(**kwargs):
+    """StsciClient with its own metrics and a rate limiter that never gets in the way"""
+    kwargs.setdefault("rate_limiter", AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=1000))
+    return StsciClient(metrics=RunMetrics(), **kwargs)
+
+
+@pytest.fixture(scope="session")
+def stub():
+    with StubStsci(FIXTURES) as stub:
+        yield stub
+
+
+@pytest.fixture
+def client(stub):
+    with fast_client(base_url=stub.base_url) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def status_ids():
+    """Proposal IDs that have a visit status fixture"""
+    return sorted(int(name.split(".")[0]) for name in os.listdir(os.path.join(FIXTURES, "status")))
@@ -0,0 +1,14 @@
+import os
+
+from benchmarks import DEFAULT_HISTORY, append_history, check_regressions, load_history
+
+
+def test_history_is_kept_out_of_the_working_tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for seconds in (0.010, 0.011, 0.010, 0.020):
+        append_history(DEFAULT_HISTORY, {"parse_go": seconds, "merge": 0.5})
+
+    assert os.listdir(tmp_path) == [".benchmarks"]
+    history = load_history(DEFAULT_HISTORY)
+    assert len(history) == 4
+    assert check_regressions(history, threshold=20.0) == [("parse_go", 0.010, 0.020, 100.0)]
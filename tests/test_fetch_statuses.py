@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import time
+
+import get_nirspec_mos_info
+from get_nirspec_mos_info import fetch_observation_statuses, get_observation_status
+
+
+def test_results_follow_the_input_order(client, status_ids):
+    proposal_ids = status_ids[:12][::-1] + [status_ids[0]]  # Reversed, with a duplicate
+    statuses = asyncio.run(fetch_observation_statuses(proposal_ids, concurrency=4, client=client))
+
+    assert list(statuses) == proposal_ids[:-1]
+    for proposal_id, result in statuses.items():
+        assert result == get_observation_status(proposal_id, client=client)
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    lock = threading.Lock()
+    in_flight = [0, 0]  # Now, most
+
+    def fake_status(proposal_id, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return [{"Visit": "1", "Status": "Archived"}], [str(proposal_id)]
+
+    monkeypatch.setattr(get_nirspec_mos_info, "get_observation_status", fake_status)
+    statuses = asyncio.run(fetch_observation_statuses(range(1000, 1030), concurrency=3))
+
+    assert in_flight[1] == 3
+    assert [headers for _, headers in statuses.values()] == [[str(i)] for i in range(1000, 1030)]
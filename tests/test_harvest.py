@@ -0,0 +1,15 @@
+import asyncio
+
+from get_nirspec_mos_info import COLUMN_SYNONYMS, DEFAULT_SOURCES, harvest
+
+
+def test_harvest_merges_the_columns_of_every_page(client):
+    df = asyncio.run(harvest(DEFAULT_SOURCES, client=client))
+
+    assert set(df["source"].str.split(" ").str[0]) == {"GO", "GTO", "DDT"}
+    assert list(df.columns[:2]) == ["source", "ID"]
+    assert not set(COLUMN_SYNONYMS) & set(df.columns)
+    for column in ("ID", "Title", "PI", "Instruments"):
+        assert df[column].notna().all(), column  # Filled on every page, not NaN outside of one
+    assert df["Instruments"].str.contains("NIRSpec").all()
+    assert (df["GO Cycle"].isna() == ~df["source"].str.startswith("GO")).all()
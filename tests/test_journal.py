@@ -0,0 +1,57 @@
+import asyncio
+
+import get_nirspec_mos_info
+from get_nirspec_mos_info import fetch_observation_statuses
+from status_store import StatusJournal
+
+
+def _fake_fetch(monkeypatch, failing=()):
+    calls = []
+
+    def fake_status(proposal_id, **kwargs):
+        calls.append(proposal_id)
+        if proposal_id in failing:
+            return [], []
+        return [{"Visit": "1", "Status": "Archived"}], ["Visit", "Status"]
+
+    monkeypatch.setattr(get_nirspec_mos_info, "get_observation_status", fake_status)
+    return calls
+
+
+def test_resume_skips_completed_and_refetches_failed(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.jsonl")
+    calls = _fake_fetch(monkeypatch, failing={1002})
+    first = asyncio.run(fetch_observation_statuses([1001, 1002, 1003], journal=StatusJournal(path)))
+    assert sorted(calls) == [1001, 1002, 1003]
+    assert first[1002] == ([], [])
+
+    calls = _fake_fetch(monkeypatch)
+    second = asyncio.run(fetch_observation_statuses([1001, 1002, 1003], journal=StatusJournal(path)))
+    assert calls == [1002]
+    assert second[1001] == first[1001] and second[1002] == first[1001]
+    assert list(second) == [1001, 1002, 1003]
+
+
+def test_ids_are_normalized(tmp_path, monkeypatch):
+    journal = StatusJournal(str(tmp_path / "journal.jsonl"))
+    journal.append(1433, [{"Visit": "1"}], ["Visit"])
+    assert journal.is_done("1433") and journal.is_done(1433.0) and journal.is_done(" 1433")
+    assert journal.pending_ids([1433.0, "1433", 1434]) == [1434]
+
+    calls = _fake_fetch(monkeypatch)
+    statuses = asyncio.run(fetch_observation_statuses(["1433", 1433.0], journal=StatusJournal(journal.path)))
+    assert calls == []
+    assert statuses["1433"] == statuses[1433.0] == ([{"Visit": "1"}], ["Visit"])
+
+
+def test_line_cut_short_is_fetched_again(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = StatusJournal(str(path))
+    journal.append(1001, [{"Visit": "1"}], ["Visit"])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "1002", "status_da')  # Crash in the middle of a record
+
+    journal = StatusJournal(str(path))
+    assert journal.pending_ids([1001, 1002]) == [1002]
+    journal.append(1002, [{"Visit": "2"}], ["Visit"])
+    assert StatusJournal(str(path)).get(1002) == ([{"Visit": "2"}], ["Visit"])
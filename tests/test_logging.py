@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+import pandas as pd
+
+import get_nirspec_mos_info
+from get_nirspec_mos_info import check_csv, fetch_observation_statuses
+from run_logging import LOGGER_NAME, ProgressLogger, capture_debug_rows
+
+
+def test_check_csv_logs_instead_of_printing(tmp_path, caplog, capsys):
+    caplog.set_level(logging.INFO, logger=LOGGER_NAME)
+    basic, status = tmp_path / "basic.csv", tmp_path / "status.csv"
+    pd.DataFrame({"ID": [1433, 1434, 1435]}).to_csv(basic, index=False)
+    pd.DataFrame({"ID": [1433, 1433, 1435]}).to_csv(status, index=False)
+
+    assert check_csv(basic, status) == {1434}
+    assert caplog.records[-1].levelname == "WARNING" and "1434" in caplog.records[-1].getMessage()
+    assert check_csv(status, basic) == set()
+    assert caplog.records[-1].getMessage() == "All checked"
+    assert capsys.readouterr().out == ""
+
+
+def test_progress_counts_failures(caplog):
+    caplog.set_level(logging.INFO, logger=LOGGER_NAME)
+    progress = ProgressLogger(logging.getLogger(LOGGER_NAME + ".test"), "Status", total=3, interval=3600)
+    progress.update()
+    progress.update(failed=True)
+    progress.update()
+    progress.finish()
+    assert (progress.done, progress.failed) == (3, 1)
+    assert caplog.records[-1].getMessage().startswith("Status: 3/3 proposals, 1 failed, ")
+
+
+def test_failed_fetches_reach_the_progress_line(monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger=LOGGER_NAME)
+
+    def fake_status(proposal_id, **kwargs):
+        return ([], []) if proposal_id == 1002 else ([{"Visit": "1"}], ["Visit"])
+
+    monkeypatch.setattr(get_nirspec_mos_info, "get_observation_status", fake_status)
+    asyncio.run(fetch_observation_statuses([1001, 1002, 1003]))
+    assert "3/3 proposals, 1 failed" in caplog.records[-1].getMessage()
+
+
+def test_rows_are_only_kept_while_captured(client, status_ids, capsys):
+    rows = capture_debug_rows(5)
+    try:
+        get_nirspec_mos_info.get_observation_status(status_ids[0], client=client)
+    finally:
+        rows.stop()
+    assert 0 < len(rows.messages()) <= 5 and rows.messages()[0].startswith("Row data: ")
+    assert capsys.readouterr() == ("", "")
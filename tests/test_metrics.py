@@ -0,0 +1,24 @@
+import pandas as pd
+
+from get_nirspec_mos_info import DEFAULT_SOURCES, build_status_table, extract_basic_info_from_GO, \
+    get_observation_status, iter_basic_info
+from run_metrics import get_metrics
+
+
+def test_parse_and_merge_metrics_stay_with_the_client(client):
+    process_rows = get_metrics().total("rows_total")
+    metrics = client.metrics
+    source = DEFAULT_SOURCES[0]
+    data, headers = extract_basic_info_from_GO(source.url, source.cycle, client=client)
+    streamed = list(iter_basic_info(source, client=client))
+    basic_df = pd.DataFrame(data, columns=headers + ["Topic", "GO Cycle"])
+    proposal_id = basic_df["ID"].iloc[0]
+    statuses = {proposal_id: get_observation_status(proposal_id, client=client)}
+    build_status_table(basic_df, statuses, metrics=metrics)
+
+    assert len(streamed) == len(data)
+    assert metrics.total("rows_total", page="GO", outcome="kept") == 2 * len(data)
+    assert metrics.total("rows_total", page="status") > 0
+    assert metrics.histogram("parse_seconds", page="GO", step="dom") is not None
+    assert metrics.histogram("stage_seconds", stage="merge") is not None
+    assert get_metrics().total("rows_total") == process_rows
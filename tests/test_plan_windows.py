@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+import random
+
+import pandas as pd
+
+from plan_windows import PlanWindowIndex
+from status_store import PlanWindow, _last_window_end, parse_plan_windows
+
+
+MOS = "NIRSpec MultiObject Spectroscopy"
+
+
+def test_parse_plan_windows():
+    text = "Apr 16, 2025 - Apr 20, 2025 (2025.106 - 2025.110)Apr 21, 2025 - May 2, 2025 (2025.111 - 2025.122)"
+    assert parse_plan_windows(text) == [PlanWindow(date(2025, 4, 16), date(2025, 4, 20)),
+                                        PlanWindow(date(2025, 4, 21), date(2025, 5, 2))]
+    assert parse_plan_windows("Dec 30, 2024 - Jan 3, 2025 (2024.365 - 2025.003)") == \
+        [PlanWindow(date(2024, 12, 30), date(2025, 1, 3))]
+    assert parse_plan_windows("Feb 28, 2024 - Mar 1, 2024") == [PlanWindow(date(2024, 2, 28), date(2024, 3, 1))]
+    assert parse_plan_windows("Ready for long range planning, plan window not yet assigned") == []
+    assert parse_plan_windows("") == parse_plan_windows(None) == []
+    assert _last_window_end(text) == pd.Timestamp("2025-05-02", tz="UTC").timestamp()
+    assert _last_window_end("") is None
+
+
+def _window_text(start, end):
+    day = lambda value: f"{value.year}.{value.timetuple().tm_yday:03d}"
+    return f"{start:%b} {start.day}, {start.year} - {end:%b} {end.day}, {end.year} ({day(start)} - {day(end)})"
+
+
+def _random_visits(seed, n=400):
+    rng = random.Random(seed)
+    visits = []
+    for i in range(n):
+        windows = []
+        start = date(2024, 1, 1) + timedelta(days=rng.randrange(900))
+        for _ in range(rng.choice([0, 1, 1, 2, 3])):
+            end = start + timedelta(days=rng.randrange(60))
+            windows.append((start, end))
+            start = end + timedelta(days=1 + rng.randrange(30))
+        fields = {"Observation": str(i), "Visit": "1", "Status": rng.choice(["Scheduled", "Flight Ready"]),
+                  "Template": rng.choice([MOS, "NIRCam Imaging"]),
+                  "Plan Windows": "".join(_window_text(*window) for window in windows)}
+        visits.append((("1433", str(i), "1"), fields, windows))
+    return visits
+
+
+def test_queries_match_brute_force():
+    visits = _random_visits(0)
+    index = PlanWindowIndex((key, fields) for key, fields, _ in visits)
+    assert len(index) == sum(len(windows) for _, _, windows in visits)
+
+    rng = random.Random(1)
+    for _ in range(300):
+        first = date(2023, 12, 1) + timedelta(days=rng.randrange(1000))
+        last = first + timedelta(days=rng.randrange(45))
+        template = rng.choice([None, MOS])
+        status = rng.choice([None, "Scheduled"])
+        expected = [key for key, fields, windows in visits
+                    if any(start <= last and end >= first for start, end in windows)
+                    and (template is None or template in fields["Template"])
+                    and (status is None or fields["Status"] == status)]
+        found = index.visits_between(first.isoformat(), last, template=template, status=status)
+        assert sorted(found) == sorted(expected)
+        assert len(found) == len(set(found))
+        for _, start, end in index.windows_between(first, last, template=template, status=status):
+            assert start <= last and end >= first
+
+
+def test_from_statuses_and_from_frame_agree():
+    visits = _random_visits(2, n=50)
+    statuses = {"1433": ([fields for _, fields, _ in visits], list(visits[0][1]))}
+    df = pd.DataFrame([{"ID": 1433, **fields} for _, fields, _ in visits])
+
+    by_statuses, by_frame = PlanWindowIndex.from_statuses(statuses), PlanWindowIndex.from_frame(df)
+    assert by_statuses.keys == by_frame.keys
+    assert by_frame.visits_between("2024-06-01", "2024-06-30", template=MOS) == \
+        by_statuses.visits_between(date(2024, 6, 1), date(2024, 6, 30), template=MOS)
+    assert len(PlanWindowIndex.from_frame(df.drop(columns="Plan Windows"))) == 0
+    assert PlanWindowIndex().visits_between("2024-01-01", "2025-01-01") == []
@@ -0,0 +1,61 @@
+import time
+
+from stsci_client import AdaptiveRateLimiter, RetryPolicy
+
+
+HOST = "www.stsci.edu"
+
+
+def test_rate_halves_on_errors_and_stops_at_the_floor():
+    limiter = AdaptiveRateLimiter(initial_rate=4.0)
+    limiter.record(HOST, 429)
+    assert limiter.rate(HOST) == 2.0
+    limiter.record(HOST, None)  # Timeout or connection error
+    assert limiter.rate(HOST) == 1.0
+    limiter.record(HOST, 503)
+    assert limiter.rate(HOST) == 0.5
+    limiter.record(HOST, 500)
+    assert limiter.rate(HOST) == limiter.min_rate == 0.5
+    limiter.record(HOST, 404)
+    assert limiter.rate(HOST) == 0.5
+
+
+def test_rate_recovers_from_the_floor_after_fast_answers():
+    limiter = AdaptiveRateLimiter()
+    for _ in range(10):
+        limiter.record(HOST, 503)
+    assert limiter.rate(HOST) == limiter.min_rate
+
+    limiter.record(HOST, 200, elapsed=5.0)  # Slow answers do not count
+    assert limiter.rate(HOST) == limiter.min_rate
+    answers = 0
+    while limiter.rate(HOST) < limiter.max_rate:
+        limiter.record(HOST, 200, elapsed=0.1)
+        answers += 1
+    assert answers == 18
+    limiter.record(HOST, 304, elapsed=0.1)
+    assert limiter.rate(HOST) == limiter.max_rate
+
+
+def test_retry_after_pauses_the_host():
+    limiter = AdaptiveRateLimiter(initial_rate=100, max_rate=100, burst=1)
+    limiter.acquire(HOST)
+    limiter.record(HOST, 429, retry_after="0.3")
+
+    start = time.monotonic()
+    limiter.acquire(HOST)
+    assert 0.25 < time.monotonic() - start < 1.0
+
+    limiter.record(HOST, 503, retry_after="Wed, 21 Oct 2015 07:28:00 GMT")  # Dates are not a pause
+    start = time.monotonic()
+    limiter.acquire(HOST)
+    assert time.monotonic() - start < 0.25
+
+
+def test_retry_delays():
+    policy = RetryPolicy(backoff=2.0, max_backoff=10.0)
+    assert policy.delay(0, retry_after="3") == 3.0
+    assert policy.delay(0, retry_after="120") == 10.0
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(10.0, 2.0 * 2 ** attempt)
+    assert 0 <= policy.delay(1, retry_after="Wed, 21 Oct 2015 07:28:00 GMT") <= 4.0
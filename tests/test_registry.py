@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from get_nirspec_mos_info import fetch_observation_statuses, get_observation_status
+from status_store import StatusRegistry, normalize_proposal_id
+
+
+@pytest.mark.parametrize("proposal_id, expected", [
+    (1433, "1433"), ("1433", "1433"), (" 1433 ", "1433"), (1433.0, "1433"), ("1433.0", "1433"),
+    ("1433.5", "1433.5"), ("abc", "abc"),
+])
+def test_normalize_proposal_id(proposal_id, expected):
+    assert normalize_proposal_id(proposal_id) == expected
+
+
+def test_same_program_is_fetched_once(client, status_ids):
+    registry = StatusRegistry()
+    proposal_id = status_ids[0]
+    first = get_observation_status(proposal_id, client=client, registry=registry)
+    second = get_observation_status(f"{proposal_id}.0", client=client, registry=registry)
+
+    assert first == second and first[1]
+    assert (registry.requested, registry.fetched) == (2, 1)
+    assert client.metrics.total("status_fetch_total") == 1
+    assert float(proposal_id) in registry
+
+
+def test_waiting_callers_share_the_running_fetch():
+    registry = StatusRegistry()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(registry.run(1433, fetch))) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    release.set()
+    for worker in workers:
+        worker.join(timeout=5)
+    assert calls == [1] and results == ["result"] * 4
+
+
+def test_errors_reach_every_caller():
+    registry = StatusRegistry()
+
+    def fetch():
+        raise ValueError("broken page")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            registry.run("1433", fetch)
+    assert registry.fetched == 1
+
+
+def test_fetch_observation_statuses_coalesces_equivalent_ids(client, status_ids):
+    proposal_id = status_ids[1]
+    statuses = asyncio.run(fetch_observation_statuses([proposal_id, str(proposal_id), f"{proposal_id}.0"],
+                                                      client=client))
+    assert len(statuses) == 3 and len({repr(result) for result in statuses.values()}) == 1
+    assert client.metrics.total("status_fetch_total") == 1
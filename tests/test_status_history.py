@@ -0,0 +1,63 @@
+from status_history import Change, StatusHistory, diff_snapshots, snapshot_rows
+
+
+def _visit(observation, visit, status, **fields):
+    return {"Observation": observation, "Visit": visit, "Status": status, **fields}
+
+
+HEADERS = ["Observation", "Visit", "Status"]
+
+FIRST = {
+    1433: ([_visit("1", "1", "Scheduled"), _visit("2", "1", "Implementation")], HEADERS),
+    "2001": ([_visit("1", "1", "Archived")], HEADERS),
+}
+SECOND = {
+    1433: ([_visit("1", "1", "Archived"), _visit("3", "1", "Implementation")], HEADERS),
+    "2001": ([_visit("1", "1", "Archived")], HEADERS),
+}
+
+
+def test_diff_gives_added_removed_and_changed_visits():
+    changes = list(diff_snapshots(snapshot_rows(FIRST), snapshot_rows(SECOND), taken_at=2.0))
+    assert changes == [
+        Change(2.0, ("1433", "1", "1"), "changed", {"Status": "Scheduled"}, {"Status": "Archived"}),
+        Change(2.0, ("1433", "2", "1"), "removed", _visit("2", "1", "Implementation"), None),
+        Change(2.0, ("1433", "3", "1"), "added", None, _visit("3", "1", "Implementation")),
+    ]
+
+
+def test_change_feed_across_runs(tmp_path):
+    directory = str(tmp_path / "history")
+    first = StatusHistory(directory).append_snapshot(FIRST, taken_at=1.0)
+    assert [change.kind for change in first] == ["added"] * 3
+
+    history = StatusHistory(directory)  # A later run diffs against the snapshot left on disk
+    assert history.append_snapshot(SECOND, taken_at=2.0) == \
+        list(diff_snapshots(snapshot_rows(FIRST), snapshot_rows(SECOND), taken_at=2.0))
+    assert history.append_snapshot(SECOND, taken_at=3.0) == []
+
+    changes, cursor = history.read_changes()
+    assert [(change.taken_at, change.kind) for change in changes] == \
+        [(1.0, "added")] * 3 + [(2.0, "changed"), (2.0, "removed"), (2.0, "added")]
+    assert history.read_changes(cursor) == ([], cursor)
+
+    history.append_snapshot(FIRST, taken_at=4.0)
+    newer, _ = history.read_changes(cursor)
+    assert [(change.key, change.kind) for change in newer] == \
+        [(("1433", "1", "1"), "changed"), (("1433", "2", "1"), "added"), (("1433", "3", "1"), "removed")]
+
+
+def test_failed_fetch_is_not_a_removal(tmp_path):
+    history = StatusHistory(str(tmp_path / "history"))
+    history.append_snapshot(FIRST, taken_at=1.0)
+    assert history.append_snapshot({**FIRST, "2001": ([], [])}, taken_at=2.0) == []
+    assert history.last_snapshot()[1] == snapshot_rows(FIRST)
+
+
+def test_kept_snapshots(tmp_path):
+    directory = str(tmp_path / "history")
+    history = StatusHistory(directory, keep_snapshots=True)
+    history.append_snapshot(FIRST, taken_at=1.0)
+    history.append_snapshot(SECOND, taken_at=2.0)
+    assert [(taken_at, rows) for taken_at, rows in StatusHistory(directory).snapshots()] == \
+        [(1.0, snapshot_rows(FIRST)), (2.0, snapshot_rows(SECOND))]
@@ -0,0 +1,79 @@
+import random
+
+from status_history import Interval, StatusIntervals
+
+
+KEY = ("1433", "1", "1")
+
+
+def _poll(intervals, taken_at, states):
+    intervals.observe(sorted((key, {"Status": state}) for key, state in states.items()), taken_at)
+
+
+def test_unchanged_polls_extend_one_interval(tmp_path):
+    intervals = StatusIntervals(str(tmp_path / "intervals.jsonl"), compact_every=None)
+    for t, state in enumerate(["Implementation"] * 3 + ["Scheduled"] * 4 + ["Archived"] * 2):
+        _poll(intervals, 100.0 * t, {KEY: state})
+
+    assert intervals.of(KEY) == [Interval("Implementation", 0.0, 200.0), Interval("Scheduled", 300.0, 600.0),
+                                 Interval("Archived", 700.0, None)]
+    assert StatusIntervals(intervals.path).of(KEY) == intervals.of(KEY)  # Reloaded from the event log
+
+
+def test_state_at_across_interval_boundaries(tmp_path):
+    intervals = StatusIntervals(str(tmp_path / "intervals.jsonl"), compact_every=None)
+    for t, state in enumerate(["Implementation", "Implementation", "Scheduled", None, "Scheduled", "Archived"]):
+        _poll(intervals, 100.0 * t, {KEY: state} if state else {})
+
+    assert intervals.state_at(KEY, -1) is None
+    assert intervals.state_at(KEY, 0) == intervals.state_at(KEY, 100) == "Implementation"
+    assert intervals.state_at(KEY, 150) is None  # Between two polls in different states
+    assert intervals.state_at(KEY, 200) == "Scheduled"
+    assert intervals.state_at(KEY, 300) is None  # Missing from that poll
+    assert intervals.state_at(KEY, 400) == "Scheduled"
+    assert intervals.state_at(KEY, 500) == "Archived"
+    assert intervals.state_at(KEY, 501) is None  # After the latest poll
+    assert intervals.in_state("Archived") == [KEY] and intervals.in_state("Scheduled", when=400) == [KEY]
+
+
+def test_compaction_merges_visits_missing_from_one_poll(tmp_path):
+    path = str(tmp_path / "intervals.jsonl")
+    intervals = StatusIntervals(path, compact_every=None)
+    other = ("1433", "2", "1")
+    seen = [True] * 4 + [False] + [True] * 4 + [False] * 3 + [True] * 2
+    for t, present in enumerate(seen):
+        _poll(intervals, 3600.0 * t + random.Random(t).uniform(-60, 60),
+              {KEY: "Scheduled", **({other: "Scheduled"} if present else {})})
+    assert len(intervals.of(other)) == 3
+
+    intervals.compact()
+    merged = intervals.of(other)
+    assert [interval.state for interval in merged] == ["Scheduled", "Scheduled"]  # Three polls missing is kept
+    assert merged[0].first_seen == intervals.of(KEY)[0].first_seen
+    assert len(intervals.of(KEY)) == 1
+
+    reloaded = StatusIntervals(path, compact_every=None)
+    assert reloaded.of(other) == merged and abs(reloaded.poll_period - 3600.0) < 120
+    assert sum(1 for _ in open(path)) == 3
+
+
+def test_compaction_keeps_other_states_in_between(tmp_path):
+    intervals = StatusIntervals(str(tmp_path / "intervals.jsonl"), compact_every=None)
+    for t, state in enumerate(["Scheduled", "Flight Ready", "Scheduled", "Scheduled"]):
+        _poll(intervals, 100.0 * t, {KEY: state})
+    intervals.compact(max_gap=float("inf"))
+    assert [interval.state for interval in intervals.of(KEY)] == ["Scheduled", "Flight Ready", "Scheduled"]
+
+
+def test_automatic_compaction_shrinks_the_history(tmp_path):
+    path = str(tmp_path / "intervals.jsonl")
+    intervals = StatusIntervals(path, compact_every=10)
+    keys = [("1433", str(observation), "1") for observation in range(20)]
+    for t in range(30):
+        # Every visit drops out of one poll in four, never of two in a row
+        _poll(intervals, 100.0 * t, {key: "Scheduled" for i, key in enumerate(keys) if (t + i) % 4 or t % 10 == 9})
+        if t == 8:
+            assert sum(len(intervals.of(key)) for key in keys) > 2 * len(keys)
+
+    assert all(len(intervals.of(key)) == 1 for key in keys)
+    assert sum(1 for _ in open(path)) == len(keys) + 1
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from get_nirspec_mos_info import VisitRow, build_status_table
+
+
+def test_merges_visits_under_their_proposal():
+    basic_df = pd.DataFrame({"ID": [1234, 5678], "Title": ["First", "Second"]})
+    statuses = {"5678": ([{"Visit": "1", "Status": "Archived"}, {"Visit": "2", "Status": "Scheduled"}],
+                         ["Visit", "Status"])}
+
+    df_status = build_status_table(basic_df, statuses)
+    assert list(df_status.columns) == ["ID", "Title", "Visit", "Status"]
+    assert df_status["Status"].tolist() == ["Archived", "Scheduled"]
+    assert (df_status["Title"] == "Second").all()
+
+
+def test_empty_tables():
+    basic_df = pd.DataFrame(columns=["ID", "Title"])
+    for status_records in ({}, [], [VisitRow("1234", {"Visit": "1", "Status": "Archived"})]):
+        df_status = build_status_table(basic_df, status_records)
+        assert df_status.empty
+        assert list(df_status.columns) == ["ID", "Title"]
+
+    df_status = build_status_table(pd.DataFrame({"ID": [1234], "Title": ["First"]}), {})
+    assert df_status.empty
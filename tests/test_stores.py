@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from get_nirspec_mos_info import DEFAULT_SOURCES, extract_basic_info_from_GO
+from sqlite_store import SqliteObservationStore
+from status_store import ObservationStore
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: ObservationStore(str(tmp_path / "observations.json")),
+    lambda tmp_path: SqliteObservationStore(str(tmp_path / "observations.sqlite")),
+], ids=["json", "sqlite"])
+def test_go_programs_round_trip(client, tmp_path, make_store):
+    source = DEFAULT_SOURCES[0]
+    store = make_store(tmp_path)
+    data, headers = extract_basic_info_from_GO(source.url, source.cycle, client=client, store=store)
+
+    stored, stored_headers = store.query_programs("GO")
+    df = pd.DataFrame(stored, columns=stored_headers)
+    assert list(df.columns[-2:]) == ["Topic", "GO Cycle"]
+    assert (df["GO Cycle"] == source.cycle).all()
+
+    mos, _ = store.query_programs("GO", instrument="NIRSpec/MOS")
+    assert mos == data
@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+import stsci_client
+from run_metrics import RunMetrics
+from stsci_client import AdaptiveRateLimiter, CircuitBreaker, HTTPCache, StsciClient
+
+
+URL = "https://www.stsci.edu/jwst/science-execution/program-information?id=1234"
+
+
+def _response(status_code=200, content=b"<html></html>", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    response.elapsed = timedelta(0)
+    response.url = URL
+    return response
+
+
+class FakeSession:
+    """Stands in for requests.Session, answering (or raising) the queued outcomes in order"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs.get("headers") or {})
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+
+def _client(session, **kwargs):
+    client = StsciClient(rate_limiter=AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=1000),
+                         metrics=RunMetrics(), **kwargs)
+    client.session = session
+    return client
+
+
+def test_failed_probe_with_broken_body_closes_the_probe():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05, max_cooldown=0.05)
+    session = FakeSession(requests.ConnectionError(), requests.exceptions.ChunkedEncodingError(), _response())
+    client = _client(session, circuit_breaker=breaker)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get(URL)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get(URL)  # The probe, once the cooldown is over
+
+    result = []
+    worker = threading.Thread(target=lambda: result.append(client.get(URL)), daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert result and result[0].status_code == 200
+    assert not breaker.is_open("www.stsci.edu")
+
+
+def test_not_modified_without_cached_body_refetches(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    session = FakeSession(_response(content=b"first", headers={"ETag": '"v1"'}), _response(304),
+                          _response(content=b"second", headers={"ETag": '"v2"'}))
+    client = _client(session, cache=cache)
+
+    assert client.get(URL).content == b"first"
+    os.remove(cache._paths(URL)[0])  # Meta left behind without its body
+
+    response = client.get(URL)
+    assert response.status_code == 200 and response.content == b"second"
+    assert session.calls[1] == {"If-None-Match": '"v1"'}
+    assert session.calls[2] == {}
+    assert cache.conditional_headers(URL) == {"If-None-Match": '"v2"'}
+
+
+class AnswerSession(FakeSession):
+    """Answers every request with a fresh 200"""
+
+    def get(self, url, **kwargs):
+        return _response()
+
+
+def test_concurrent_hedged_gets_share_one_pool(monkeypatch):
+    pools = []
+
+    class SlowPool(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)  # Widen the window between checking for a pool and creating one
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(stsci_client, "ThreadPoolExecutor", SlowPool)
+    client = _client(AnswerSession())
+    for _ in range(client.latency.min_samples):
+        client.latency.record("www.stsci.edu", 1.0)
+
+    start = threading.Barrier(8)
+    workers = [threading.Thread(target=lambda: (start.wait(), client.hedged_get(URL))) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=5)
+    assert len(pools) == 1
+
+    client.close()
+    assert client._hedge_pool is None and pools[0]._shutdown
+
+
+class SlowFirstSession(FakeSession):
+    """The first request hangs for `stall` seconds, every later one answers at once"""
+
+    def __init__(self, stall):
+        super().__init__()
+        self.stall = stall
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            number = len(self.calls)
+            self.calls.append(kwargs.get("headers") or {})
+        if number == 0:
+            time.sleep(self.stall)
+        return _response(content=b"request %d" % number)
+
+
+def _warmed_up(client, seconds):
+    for _ in range(client.latency.min_samples):
+        client.latency.record("www.stsci.edu", seconds)
+    return client
+
+
+def test_hedge_waits_for_latency_samples():
+    session = SlowFirstSession(stall=0.2)
+    client = _client(session)
+    assert client.hedged_get(URL).content == b"request 0"
+    assert len(session.calls) == 1 and client._hedge_pool is None
+
+
+def test_slow_request_is_hedged_and_the_backup_wins():
+    session = SlowFirstSession(stall=0.5)
+    client = _warmed_up(_client(session), 0.05)
+
+    start = time.monotonic()
+    assert client.hedged_get(URL).content == b"request 1"
+    assert time.monotonic() - start < 0.4
+    assert len(session.calls) == 2
+    assert client.metrics.total("http_hedges_total", winner="backup") == 1
+    client.close()
+
+
+def test_fast_request_is_not_hedged():
+    session = SlowFirstSession(stall=0.0)
+    client = _warmed_up(_client(session), 1.0)
+    assert client.hedged_get(URL).content == b"request 0"
+    assert len(session.calls) == 1
+    assert client.metrics.total("http_hedges_total") == 0
+    client.close()
@@ -0,0 +1,32 @@
+import os
+
+import requests
+
+import stsci_stub_server
+from stsci_stub_server import StubStsci
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+
+def test_summary_after_a_stall():
+    with StubStsci(FIXTURES, timeout_rate=1.0, stall=0.2, seed=1) as stub:
+        assert requests.get(stub.base_url + "/no-such-page", timeout=5).status_code == 404
+        assert stub.hits == {("page", "stall"): 1, ("page", 404): 1}
+        assert stub.summary() == "page 404: 1, page stall: 1"
+
+
+def test_main_prints_the_summary_on_ctrl_c(monkeypatch, capsys):
+    class InterruptedStub(StubStsci):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.count("page", "stall")
+            self.count("page", 200)
+            self.server.serve_forever = self.interrupt
+
+        def interrupt(self):
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(stsci_stub_server, "StubStsci", InterruptedStub)
+    stsci_stub_server.main(["--fixtures", FIXTURES, "--port", "0", "--timeout-rate", "0.5"])
+    assert capsys.readouterr().out.splitlines()[-1] == "page 200: 1, page stall: 1"